@@ -0,0 +1,328 @@
+"""
+Load benchmark for the Flask endpoints, run against a local fake OpenAI service.
+
+    python bench_server.py --requests 200 --concurrency 8 --latency 0.3 --error-rate 0.02
+
+The fake service answers /v1/embeddings and /v1/chat/completions with deterministic
+responses after a configurable delay, and fails a configurable fraction of calls. The
+app runs in-process on a threaded werkzeug server with its embedding index and LLM
+response cache in a scratch directory, so every run starts cold and touches nothing on
+disk. Reports requests/sec and p50/p95/p99 latency per endpoint, upstream OpenAI calls
+and the LLM response cache hit rate.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+ENDPOINTS = ['/api/data', '/recommend-majors', '/learning-resources', '/additional-resources']
+
+INTERESTS = [
+    ["programming", "math"], ["biology", "helping people"], ["art", "design"],
+    ["business", "leadership"], ["music"], ["writing", "history"], ["chemistry"],
+    ["sports", "health"], ["engineering", "robots"], ["psychology", "teaching"]
+]
+
+
+def fake_embedding(text, dim):
+    """Deterministic unit vector seeded by the text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def fake_chat_reply(messages):
+    """Answer shaped like what each route's prompt asks for"""
+    prompt = messages[-1]["content"]
+    if "JSON array" in prompt:
+        return json.dumps([{"title": f"Resource {i}", "type": "website", "url": f"https://example.com/{i}"}
+                           for i in range(8)])
+    return json.dumps({
+        "resources_intro": "You can look at some additional resources to learn more:",
+        "resources": ["Example: https://example.com"] * 3,
+        "resume_tips_intro": "Here are some resume-building and interview preparation tips:",
+        "resume_tips": ["Tip 1", "Tip 2", "Tip 3"],
+        "internships_intro": "Here are some types of internships available for this major and companies to apply to:",
+        "internships": ["Internship 1", "Internship 2", "Internship 3"]
+    })
+
+
+class FakeOpenAI:
+    """Local stand-in for the OpenAI REST API with injected latency and errors"""
+
+    def __init__(self, latency=0.2, jitter=0.0, error_rate=0.0, dim=1536):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.dim = dim
+        self.calls = {"embeddings": 0, "chat": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _count(self, key):
+        with self._lock:
+            self.calls[key] += 1
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream_reply(self, payload, delay):
+                """Send the completion as SSE chunks, spreading `delay` across them"""
+                content = fake_chat_reply(payload["messages"])
+                pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for piece in pieces:
+                    time.sleep(delay / len(pieces))
+                    chunk = {"object": "chat.completion.chunk", "model": payload.get("model"),
+                             "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                delay = max(0.0, service.latency + random.uniform(-service.jitter, service.jitter))
+                streaming = payload.get("stream") and self.path.endswith('/chat/completions')
+                # A streamed completion starts quickly and generates for the rest of the delay
+                time.sleep(delay * 0.1 if streaming else delay)
+                if random.random() < service.error_rate:
+                    service._count("errors")
+                    return self._reply(500, {"error": {"message": "Injected upstream failure", "type": "server_error"}})
+                if self.path.endswith('/embeddings'):
+                    service._count("embeddings")
+                    inputs = payload["input"] if isinstance(payload["input"], list) else [payload["input"]]
+                    return self._reply(200, {
+                        "object": "list",
+                        "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(text, service.dim)}
+                                 for i, text in enumerate(inputs)],
+                        "model": payload.get("model"),
+                        "usage": {"prompt_tokens": 0, "total_tokens": 0}
+                    })
+                if self.path.endswith('/chat/completions'):
+                    service._count("chat")
+                    if streaming:
+                        return self._stream_reply(payload, delay * 0.9)
+                    return self._reply(200, {
+                        "object": "chat.completion",
+                        "model": payload.get("model"),
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": fake_chat_reply(payload["messages"])}}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                    })
+                self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def stop(self):
+        self._server.shutdown()
+
+
+def start_app(fake_api_base, scratch_dir):
+    """Import the app pointed at the fake service and serve it on a free port"""
+    os.environ['OPENAI_API_KEY'] = 'benchmark-no-network'
+    os.environ['OPENAI_API_BASE'] = fake_api_base
+    os.environ['MAJOR_INDEX_DIR'] = os.path.join(scratch_dir, 'index')
+    os.environ['LLM_CACHE_PATH'] = os.path.join(scratch_dir, 'llm_responses.sqlite3')
+
+    import openai
+    import server
+    from werkzeug.serving import make_server
+
+    openai.api_base = fake_api_base
+    # Per-request access logs would dominate the output
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    httpd = make_server('127.0.0.1', 0, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return server, httpd, f"http://127.0.0.1:{httpd.server_port}"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values), max(1, math.ceil(pct / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def make_requests(endpoint, count, school_names, major_names, distinct):
+    """Build (method, path, json_body) tuples; `distinct` caps unique LLM questions to set the hit rate"""
+    built = []
+    for i in range(count):
+        if endpoint == '/api/data':
+            built.append(('GET', endpoint, None))
+        elif endpoint == '/recommend-majors':
+            built.append(('POST', endpoint, {"school_name": school_names[i % len(school_names)],
+                                             "interests": INTERESTS[i % len(INTERESTS)]}))
+        else:
+            built.append(('POST', endpoint, {"major": major_names[i % min(distinct, len(major_names))]}))
+    return built
+
+
+def drive(base_url, planned, concurrency, stream=False):
+    """
+    Send the planned requests from `concurrency` threads.
+    Returns (latencies, times to first byte, errors, wall). With `stream`, the LLM routes
+    are asked for NDJSON streaming and an error event in the body counts as a failure.
+    """
+    local = threading.local()
+
+    def send(item):
+        method, path, body = item
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        headers = {'Accept-Encoding': 'gzip'}
+        if stream and method == 'POST' and path != '/recommend-majors':
+            headers['Accept'] = 'application/x-ndjson'
+        started = time.perf_counter()
+        first_byte = None
+        try:
+            response = local.session.request(method, base_url + path, json=body, headers=headers,
+                                             timeout=120, stream=True)
+            chunks = []
+            for chunk in response.iter_content(chunk_size=None):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                chunks.append(chunk)
+            ok = response.status_code < 400 and b'"event": "error"' not in b''.join(chunks)
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        return elapsed, first_byte if first_byte is not None else elapsed, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, planned))
+    wall = time.perf_counter() - started
+    return (sorted(latency for latency, _, _ in results), sorted(ttfb for _, ttfb, _ in results),
+            sum(1 for _, _, ok in results if not ok), wall)
+
+
+def wait_for_background(server, timeout=60.0):
+    """
+    Let background embedding work started by the previous requests (index syncs, interest
+    embeddings that missed the deadline) finish, so its upstream calls count against the
+    endpoint that started it.
+    """
+    deadline = time.monotonic() + timeout
+    while not server.background_idle() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def run_benchmark(endpoints, requests_per_endpoint, concurrency, latency, jitter, error_rate, distinct, dim,
+                  stream=False):
+    fake = FakeOpenAI(latency=latency, jitter=jitter, error_rate=error_rate, dim=dim)
+    fake_api_base = fake.start()
+    report = {"endpoints": {}}
+
+    with tempfile.TemporaryDirectory() as scratch:
+        server, httpd, base_url = start_app(fake_api_base, scratch)
+        try:
+            # Build the embedding index before timing, as the server does at startup,
+            # without injected failures so a run always starts from a complete index
+            fake.error_rate = 0.0
+            warm_started = time.perf_counter()
+            server.warm_major_index()
+            report["index_warmup_seconds"] = round(time.perf_counter() - warm_started, 3)
+            fake.error_rate = error_rate
+
+            schools = list(server.catalog.snapshot().schools.values())
+            school_names = [school["school_name"] for school in schools]
+            major_names = [major["name"] for school in schools for major in school.get("majors", [])]
+
+            for endpoint in endpoints:
+                planned = make_requests(endpoint, requests_per_endpoint, school_names, major_names, distinct)
+                upstream_before = dict(fake.calls)
+                cache_before = server.llm_cache.stats()
+                latencies, ttfbs, errors, wall = drive(base_url, planned, concurrency, stream=stream)
+                wait_for_background(server)
+                cache_after = server.llm_cache.stats()
+
+                hits = sum(cache_after[key] - cache_before[key] for key in ("memory_hits", "disk_hits"))
+                lookups = hits + sum(cache_after[key] - cache_before[key] for key in ("expired", "misses"))
+                report["endpoints"][endpoint] = {
+                    "requests": len(planned),
+                    "errors": errors,
+                    "requests_per_second": round(len(planned) / wall, 1),
+                    "p50_ms": round(1000 * percentile(latencies, 50), 2),
+                    "p95_ms": round(1000 * percentile(latencies, 95), 2),
+                    "p99_ms": round(1000 * percentile(latencies, 99), 2),
+                    "ttfb_p50_ms": round(1000 * percentile(ttfbs, 50), 2),
+                    "upstream_calls": {key: fake.calls[key] - upstream_before[key] for key in fake.calls},
+                    "llm_cache_hit_rate": round(hits / lookups, 3) if lookups else None
+                }
+        finally:
+            httpd.shutdown()
+            fake.stop()
+    return report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the Flask endpoints against a fake OpenAI service")
+    arg_parser.add_argument('--endpoints', nargs='+', default=ENDPOINTS, choices=ENDPOINTS)
+    arg_parser.add_argument('--requests', type=int, default=200, help="Requests sent to each endpoint")
+    arg_parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client connections")
+    arg_parser.add_argument('--latency', type=float, default=0.2, help="Seconds the fake OpenAI service takes per call")
+    arg_parser.add_argument('--jitter', type=float, default=0.05, help="Random +/- seconds added to --latency")
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of upstream calls that fail")
+    arg_parser.add_argument('--distinct', type=int, default=20,
+                            help="Distinct majors asked about on the LLM routes (sets the cache hit rate)")
+    arg_parser.add_argument('--dim', type=int, default=1536, help="Fake embedding dimension")
+    arg_parser.add_argument('--stream', action='store_true', help="Request NDJSON streaming from the LLM routes")
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = arg_parser.parse_args()
+
+    random.seed(args.seed)
+    # The in-process app prints as it serves; keep stdout for the report alone
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmark(args.endpoints, args.requests, args.concurrency, args.latency,
+                               args.jitter, args.error_rate, max(1, args.distinct), args.dim, stream=args.stream)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"\nIndex warmup: {report['index_warmup_seconds']}s")
+    print(f"{'endpoint':24} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttfb p50':>9} {'errors':>7} {'upstream':>9} {'cache hit':>10}")
+    for endpoint, result in report["endpoints"].items():
+        upstream = result["upstream_calls"]["embeddings"] + result["upstream_calls"]["chat"]
+        hit_rate = '-' if result["llm_cache_hit_rate"] is None else f"{result['llm_cache_hit_rate']:.0%}"
+        print(f"{endpoint:24} {result['requests_per_second']:>8} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+              f"{result['p99_ms']:>9} {result['ttfb_p50_ms']:>9} {result['errors']:>7} {upstream:>9} {hit_rate:>10}")
+
+
+if __name__ == "__main__":
+    main()
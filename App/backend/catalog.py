@@ -0,0 +1,345 @@
+import base64
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# Brotli is optional; without it /api/data is served gzip or uncompressed only
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# The transformer always writes school_name first, so it can be read from the file header
+SCHOOL_NAME_PATTERN = re.compile(rb'^\s*\{\s*"school_name"\s*:\s*("(?:[^"\\]|\\.)*")')
+HEADER_BYTES = 4096
+
+# /api/data projections: whole majors, or {"name": ...} only
+PROJECTIONS = ('full', 'names')
+# Query responses kept pre-encoded per snapshot
+SLICE_CACHE_SIZE = 128
+
+
+def fold(name):
+    """Normalize a school or major name for case-insensitive lookups"""
+    return name.strip().casefold()
+
+
+def encode_payloads(body):
+    """Return {content-encoding: bytes} for a serialized JSON body"""
+    payloads = {
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0)
+    }
+    if brotli is not None:
+        payloads['br'] = brotli.compress(body, quality=11)
+    return payloads
+
+
+def dumps(value):
+    """Compact UTF-8 JSON, the same encoding used for the full /api/data body"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def pick_payload(payloads, accepted_encodings):
+    """Pick the smallest payload the client accepts; returns (encoding, bytes)"""
+    best = ('identity', payloads['identity'])
+    for encoding, body in payloads.items():
+        if encoding in accepted_encodings and len(body) < len(best[1]):
+            best = (encoding, body)
+    return best
+
+
+def encode_cursor(etag, offset):
+    """Opaque pagination cursor, tied to the catalog revision it was issued for"""
+    return base64.urlsafe_b64encode(f"{etag[:12]}:{offset}".encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, etag):
+    """Return the offset in a cursor, or raise ValueError if it is malformed or from another revision"""
+    try:
+        revision, offset = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii').split(':')
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+    if offset < 0:
+        raise ValueError("Invalid cursor.")
+    if revision != etag[:12]:
+        raise ValueError("The catalog has changed since this cursor was issued; start again without it.")
+    return offset
+
+
+def major_courses(major):
+    """Flatten a transformed major's curriculum into an ordered list of course strings"""
+    courses = []
+    for year in major.get("curriculum", {}).values():
+        for semester in year.values():
+            courses.extend(semester)
+    return courses
+
+
+class CatalogSnapshot:
+    """
+    Parsed catalog data plus lookup indexes and lazily built response bodies.
+
+    data may be a single school dict or a list of schools. Schools are indexed by
+    case-folded name, majors by case-folded name within each school, and each
+    major's courses are flattened once.
+    """
+
+    def __init__(self, data, fingerprint):
+        self.data = data
+        self.fingerprint = fingerprint
+        self.etag = fingerprint[:32]
+        self._payloads = None
+        self._slices = {}
+        self._slice_payloads = OrderedDict()
+        self._lock = threading.Lock()
+
+        schools = data if isinstance(data, list) else [data]
+        self.schools = {}
+        self.majors = {}
+        self.courses = {}
+        for school in schools:
+            school_key = fold(school.get("school_name", ""))
+            self.schools[school_key] = school
+            majors = self.majors.setdefault(school_key, {})
+            for major in school.get("majors", []):
+                major_key = fold(major['name'])
+                majors[major_key] = major
+                self.courses[(school_key, major_key)] = major_courses(major)
+
+    @property
+    def payloads(self):
+        if self._payloads is None:
+            with self._lock:
+                if self._payloads is None:
+                    self._payloads = encode_payloads(dumps(self.data))
+        return self._payloads
+
+    def payload(self, accepted_encodings):
+        """Pick the smallest payload the client accepts; returns (encoding, bytes)"""
+        return pick_payload(self.payloads, accepted_encodings)
+
+    def school_slices(self, school_key):
+        """A school's name and each major pre-serialized once per projection"""
+        slices = self._slices.get(school_key)
+        if slices is None:
+            school = self.schools[school_key]
+            majors = school.get("majors", [])
+            slices = {
+                "school_name": dumps(school.get("school_name", "")),
+                "keys": [fold(major['name']) for major in majors],
+                "full": [dumps(major) for major in majors],
+                "names": [dumps({"name": major['name']}) for major in majors]
+            }
+            self._slices[school_key] = slices
+        return slices
+
+    def query_body(self, school_name, fields='full', major_names=None, offset=0, limit=None):
+        """
+        Build {"school_name", "majors"[, "next_cursor"]} for one school by joining
+        pre-serialized major slices, so the cost scales with the majors returned.
+        Returns None if the school is unknown.
+        """
+        school_key = fold(school_name)
+        if school_key not in self.schools:
+            return None
+        slices = self.school_slices(school_key)
+        positions = range(len(slices["keys"]))
+        if major_names:
+            wanted = {fold(name) for name in major_names}
+            positions = [i for i in positions if slices["keys"][i] in wanted]
+        end = len(positions) if limit is None else min(len(positions), offset + limit)
+        parts = [b'{"school_name":', slices["school_name"], b',"majors":[',
+                 b','.join(slices[fields][i] for i in positions[offset:end]), b']']
+        if end < len(positions):
+            parts += [b',"next_cursor":', dumps(encode_cursor(self.etag, end))]
+        parts.append(b'}')
+        return b''.join(parts)
+
+    def query_payload(self, accepted_encodings, school_name, fields='full', major_names=None, offset=0, limit=None):
+        """query_body() encoded for the client, cached per query; returns (encoding, bytes) or None"""
+        key = (fold(school_name), fields, tuple(sorted(fold(name) for name in major_names or ())), offset, limit)
+        with self._lock:
+            payloads = self._slice_payloads.get(key)
+            if payloads is not None:
+                self._slice_payloads.move_to_end(key)
+        if payloads is None:
+            body = self.query_body(school_name, fields, major_names, offset, limit)
+            if body is None:
+                return None
+            payloads = encode_payloads(body)
+            with self._lock:
+                self._slice_payloads[key] = payloads
+                while len(self._slice_payloads) > SLICE_CACHE_SIZE:
+                    self._slice_payloads.popitem(last=False)
+        return pick_payload(payloads, accepted_encodings)
+
+    def school(self, school_name):
+        return self.schools.get(fold(school_name))
+
+    def major(self, school_name, major_name):
+        return self.majors.get(fold(school_name), {}).get(fold(major_name))
+
+    def major_course_list(self, school_name, major_name):
+        return self.courses.get((fold(school_name), fold(major_name)))
+
+
+class SchoolCatalog:
+    """
+    In-process cache of a catalog JSON file.
+
+    The file is parsed once and re-read only when its mtime or size changes; a changed
+    stat with identical contents (same sha256) keeps the existing snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stat = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _file_stat(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def snapshot(self):
+        """Return the current CatalogSnapshot, reloading the file if it changed"""
+        current_stat = self._file_stat()
+        snapshot = self._snapshot
+        if snapshot is not None and current_stat == self._stat:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not None and current_stat == self._stat:
+                return self._snapshot
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            fingerprint = hashlib.sha256(raw).hexdigest()
+            if self._snapshot is None or self._snapshot.fingerprint != fingerprint:
+                self._snapshot = CatalogSnapshot(json.loads(raw), fingerprint)
+            self._stat = current_stat
+            return self._snapshot
+
+    @property
+    def data(self):
+        return self.snapshot().data
+
+
+def read_school_names(path):
+    """
+    Return the school names stored in a catalog file.
+
+    Single-school files only have their header read; files holding a list of
+    schools have to be parsed in full.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_BYTES)
+    match = SCHOOL_NAME_PATTERN.match(header)
+    if match:
+        return [json.loads(match.group(1))]
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    schools = data if isinstance(data, list) else [data]
+    return [school.get("school_name", "") for school in schools]
+
+
+class CatalogStore:
+    """
+    Multi-school catalog backed by a directory of per-school transformed JSON files.
+
+    Only file headers are read to build the school-name index; a school's file is parsed
+    on first use and kept in a bounded LRU of loaded files. Files given in pinned_paths
+    (e.g. the legacy data.json) are never evicted. The directory's mtime is checked on
+    every lookup, so school files added or removed while serving are picked up.
+    """
+
+    def __init__(self, directory=None, pinned_paths=(), max_loaded=32):
+        self.directory = directory
+        self.max_loaded = max_loaded
+        self.pinned = {path: SchoolCatalog(path) for path in pinned_paths}
+        self._loaded = OrderedDict()
+        self._paths = {}
+        self._directory_stat = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def _stat_directory(self):
+        try:
+            return os.stat(self.directory).st_mtime_ns if self.directory else None
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Rescan the data directory and rebuild the school-name -> file index"""
+        # Taken before scanning, so a file added mid-scan triggers another one
+        directory_stat = self._stat_directory()
+        paths = {}
+        files = list(self.pinned)
+        if self.directory and os.path.isdir(self.directory):
+            files += sorted(glob.glob(os.path.join(self.directory, '*.json')))
+        for path in files:
+            try:
+                names = read_school_names(path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable catalog file {path}: {e}")
+                continue
+            for name in names:
+                # Pinned files come first and win over directory duplicates
+                paths.setdefault(fold(name), path)
+        with self._lock:
+            self._paths = paths
+            self._directory_stat = directory_stat
+
+    def _refresh_if_changed(self):
+        """Rescan when files have been added to or removed from the data directory"""
+        if self._stat_directory() != self._directory_stat:
+            self.refresh()
+
+    def school_names(self):
+        self._refresh_if_changed()
+        return list(self._paths)
+
+    def catalog_for_path(self, path):
+        """Return the SchoolCatalog for a file, loading it into the LRU if needed"""
+        if path in self.pinned:
+            return self.pinned[path]
+        with self._lock:
+            catalog = self._loaded.get(path)
+            if catalog is None:
+                catalog = SchoolCatalog(path)
+                self._loaded[path] = catalog
+                while len(self._loaded) > self.max_loaded:
+                    self._loaded.popitem(last=False)
+            else:
+                self._loaded.move_to_end(path)
+            return catalog
+
+    def path_for(self, school_name):
+        """Return the catalog file holding school_name, or None if it is unknown"""
+        self._refresh_if_changed()
+        return self._paths.get(fold(school_name))
+
+    def snapshot_for(self, school_name):
+        """Return the CatalogSnapshot holding school_name, or None if it is unknown"""
+        path = self.path_for(school_name)
+        if path is None:
+            return None
+        return self.catalog_for_path(path).snapshot()
+
+    def school(self, school_name):
+        snapshot = self.snapshot_for(school_name)
+        return snapshot.school(school_name) if snapshot else None
+
+    def major(self, school_name, major_name):
+        snapshot = self.snapshot_for(school_name)
+        return snapshot.major(school_name, major_name) if snapshot else None
+
+    def major_course_list(self, school_name, major_name):
+        snapshot = self.snapshot_for(school_name)
+        return snapshot.major_course_list(school_name, major_name) if snapshot else None
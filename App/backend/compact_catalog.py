@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from course_postings import CLASSIFICATIONS, SEMESTERS
+
+# Reader for the compact binary catalog written by Data/compact_catalog.py; see that
+# module's docstring for the layout.
+CCAT_MAGIC = b"CCAT"
+CCAT_VERSION = 1
+HEADER_SIZE = 64
+
+COURSE_DTYPE = np.dtype([('text', '<u4'), ('code', '<u4')])
+MAJOR_DTYPE = np.dtype([('name', '<u4'), ('mask', '<u4'), ('bounds', '<u4', (9,))])
+
+
+def compact_path_for(json_path):
+    """The .ccat file that sits next to a transformed JSON file"""
+    return os.path.splitext(json_path)[0] + '.ccat'
+
+
+def _aligned(size):
+    return size + (-size % 8)
+
+
+class CompactCatalog:
+    """
+    Memory-mapped .ccat catalog. Opening it only reads the 64-byte header; strings and
+    majors are decoded on demand, one major at a time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._map = np.memmap(path, dtype=np.uint8, mode='r')
+        header = bytes(self._map[:HEADER_SIZE])
+        if header[:4] != CCAT_MAGIC:
+            raise ValueError(f"{path} is not a compact catalog")
+        fields = np.frombuffer(header, dtype='<u4', count=8, offset=4)
+        version, school_name_id, string_count, course_count, major_count, curriculum_length = fields[:6]
+        if version != CCAT_VERSION:
+            raise ValueError(f"{path} has unsupported compact catalog version {version}")
+        self.source_fingerprint = header[32:64].hex()
+
+        offset = HEADER_SIZE
+        self._string_offsets = np.frombuffer(self._map, dtype='<u4', count=int(string_count) + 1, offset=offset)
+        offset += _aligned(4 * (int(string_count) + 1))
+        self._string_data_offset = offset
+        offset += _aligned(int(self._string_offsets[-1]))
+        self.courses = np.frombuffer(self._map, dtype=COURSE_DTYPE, count=int(course_count), offset=offset)
+        offset += _aligned(COURSE_DTYPE.itemsize * int(course_count))
+        self.majors = np.frombuffer(self._map, dtype=MAJOR_DTYPE, count=int(major_count), offset=offset)
+        offset += _aligned(MAJOR_DTYPE.itemsize * int(major_count))
+        self.curriculum = np.frombuffer(self._map, dtype='<u4', count=int(curriculum_length), offset=offset)
+
+        self._strings = {}
+        self._major_index = None
+        self._lock = threading.Lock()
+        self.school_name = self.string(int(school_name_id))
+
+    def string(self, string_id):
+        text = self._strings.get(string_id)
+        if text is None:
+            start = self._string_data_offset + int(self._string_offsets[string_id])
+            end = self._string_data_offset + int(self._string_offsets[string_id + 1])
+            text = self._strings[string_id] = bytes(self._map[start:end]).decode('utf-8')
+        return text
+
+    def major_names(self):
+        return [self.string(int(name_id)) for name_id in self.majors['name']]
+
+    def find_major(self, major_name):
+        """Row of a major by case-insensitive name, or None"""
+        if self._major_index is None:
+            with self._lock:
+                if self._major_index is None:
+                    self._major_index = {name.strip().casefold(): row for row, name in enumerate(self.major_names())}
+        return self._major_index.get(major_name.strip().casefold())
+
+    def course_ids(self, row, classification, semester):
+        bounds = self.majors[row]['bounds']
+        slot = 2 * CLASSIFICATIONS.index(classification) + SEMESTERS.index(semester)
+        return self.curriculum[bounds[slot]:bounds[slot + 1]]
+
+    def decode_major(self, row):
+        """Rebuild one major exactly as it appears in the transformed JSON"""
+        record = self.majors[row]
+        curriculum = {}
+        for position, classification in enumerate(CLASSIFICATIONS):
+            if not record['mask'] & (1 << position):
+                continue
+            curriculum[classification] = {
+                semester: [self.string(int(self.courses[course]['text']))
+                           for course in self.course_ids(row, classification, semester)]
+                for semester in SEMESTERS
+            }
+        return {"name": self.string(int(record['name'])), "curriculum": curriculum}
+
+    def major(self, major_name):
+        row = self.find_major(major_name)
+        return None if row is None else self.decode_major(row)
+
+
+class CompactCatalogFiles:
+    """
+    Opens the .ccat file next to each catalog JSON file, but only while it was built from
+    that exact JSON (matching sha256); otherwise callers fall back to the JSON catalog.
+    """
+
+    def __init__(self):
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def get(self, json_path):
+        compact_path = compact_path_for(json_path)
+        try:
+            json_stat = os.stat(json_path)
+            compact_stat = os.stat(compact_path)
+        except OSError:
+            return None
+        stamp = (json_stat.st_mtime_ns, json_stat.st_size, compact_stat.st_mtime_ns, compact_stat.st_size)
+        cached = self._open.get(json_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        with self._lock:
+            compact = None
+            try:
+                candidate = CompactCatalog(compact_path)
+                with open(json_path, 'rb') as f:
+                    if hashlib.sha256(f.read()).hexdigest() == candidate.source_fingerprint:
+                        compact = candidate
+                    else:
+                        print(f"Ignoring stale compact catalog {compact_path}")
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable compact catalog {compact_path}: {e}")
+            self._open[json_path] = (stamp, compact)
+            return compact
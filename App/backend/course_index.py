@@ -0,0 +1,173 @@
+import json
+import re
+import threading
+
+from course_postings import (COURSE_INDEX_VERSION, CourseIndexBuilder, course_code,
+                             course_index_path_for)
+
+# Reader for the course inverted index written by Data/course_index.py; the format and
+# the builder used by both sides are in course_postings.py.
+
+
+def code_key(code):
+    """Normalize a course code so "MAT 231", "mat231" and "MAT_231" match"""
+    return re.sub(r'[\s_]+', '', code).upper()
+
+
+def build_index_dict(school, source_sha256=None):
+    """Build the same document Data/course_index.py writes, from a parsed school"""
+    builder = CourseIndexBuilder(school.get("school_name", ""))
+    for major in school.get("majors", []):
+        builder.add_major(major)
+    return builder.to_dict(source_sha256)
+
+
+def _bits(mask):
+    """Positions of the set bits of an int bitset, lowest first"""
+    positions = []
+    while mask:
+        low = mask & -mask
+        positions.append(low.bit_length() - 1)
+        mask ^= low
+    return positions
+
+
+class CourseIndex:
+    """
+    Course code -> majors inverted index for one school.
+
+    Both directions are kept as int bitsets: course_majors[c] has bit m set when major m
+    requires course c, and major_courses[m] has bit c set for every course in major m.
+    "Majors requiring all of these courses" is an AND over course_majors, and the overlap
+    between a set of courses and a major is a popcount of an AND with major_courses[m].
+    """
+
+    def __init__(self, document):
+        self.school_name = document["school_name"]
+        self.majors = document["majors"]
+        self.codes = [course["code"] for course in document["courses"]]
+        self.names = [course["names"] for course in document["courses"]]
+        self.postings = [course["postings"] for course in document["courses"]]
+        self.keys = {}
+        for course_id, code in enumerate(self.codes):
+            self.keys.setdefault(code_key(code), course_id)
+        self._search_keys = list(self.keys.items())
+        self._search_names = [' '.join(names).casefold() for names in self.names]
+
+        self.course_majors = [0] * len(self.codes)
+        self.major_courses = [0] * len(self.majors)
+        for course_id, postings in enumerate(self.postings):
+            for major, _, _ in postings:
+                self.course_majors[course_id] |= 1 << major
+                self.major_courses[major] |= 1 << course_id
+        self.major_course_counts = [mask.bit_count() for mask in self.major_courses]
+
+    def lookup(self, course):
+        """Course id for a code or a full "CODE Name" string, or None"""
+        course_id = self.keys.get(code_key(course))
+        if course_id is None:
+            course_id = self.keys.get(code_key(course_code(course)))
+        return course_id
+
+    def search(self, query, limit=20):
+        """Course ids matching a query: exact code first, then code prefixes, then name substrings"""
+        key = code_key(query)
+        needle = query.strip().casefold()
+        if not key:
+            return []
+        exact = self.lookup(query)
+        results = [] if exact is None else [exact]
+        for candidate, course_id in self._search_keys:
+            if len(results) >= limit:
+                return results
+            if candidate.startswith(key) and course_id != exact:
+                results.append(course_id)
+        seen = set(results)
+        for course_id, names in enumerate(self._search_names):
+            if len(results) >= limit:
+                break
+            if course_id not in seen and needle in names:
+                results.append(course_id)
+        return results
+
+    def course_bitset(self, course_ids):
+        mask = 0
+        for course_id in course_ids:
+            mask |= 1 << course_id
+        return mask
+
+    def course_codes(self, mask):
+        """Codes of the courses in a course bitset"""
+        return [self.codes[course_id] for course_id in _bits(mask)]
+
+    def majors_requiring(self, course_ids):
+        """Major positions that require every one of the given courses"""
+        if not course_ids:
+            return []
+        mask = -1
+        for course_id in course_ids:
+            mask &= self.course_majors[course_id]
+        return _bits(mask)
+
+    def overlap(self, course_ids, limit=10):
+        """
+        Rank majors by how many of the given courses they include; returns
+        (major position, overlap count, matched course mask) tuples, best first.
+        """
+        completed = self.course_bitset(course_ids)
+        ranked = []
+        for major, courses in enumerate(self.major_courses):
+            matched = courses & completed
+            if matched:
+                ranked.append((major, matched.bit_count(), matched))
+        ranked.sort(key=lambda item: (-item[1], -item[1] / self.major_course_counts[item[0]], item[0]))
+        return ranked[:limit]
+
+    def course_record(self, course_id, include_majors=True):
+        record = {"code": self.codes[course_id], "names": self.names[course_id]}
+        if include_majors:
+            placements = {}
+            for major, classification, semester in self.postings[course_id]:
+                placements.setdefault(major, []).append({"year": classification, "semester": semester})
+            record["majors"] = [{"name": self.majors[major], "placements": placements[major]}
+                                for major in placements]
+        return record
+
+
+class CourseIndexes:
+    """
+    One CourseIndex per school and catalog revision. The .cidx file written next to the
+    catalog JSON is used while its sha256 stamp matches the snapshot; otherwise the index
+    is built from the parsed catalog.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, json_path, snapshot, school_key):
+        key = (json_path, school_key)
+        cached = self._indexes.get(key)
+        if cached is not None and cached[0] == snapshot.fingerprint:
+            return cached[1]
+
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached is not None and cached[0] == snapshot.fingerprint:
+                return cached[1]
+            school = snapshot.schools[school_key]
+            document = None
+            try:
+                with open(course_index_path_for(json_path), 'r', encoding='utf-8') as f:
+                    candidate = json.load(f)
+                if (candidate.get("version") == COURSE_INDEX_VERSION
+                        and candidate.get("source_sha256") == snapshot.fingerprint
+                        and candidate.get("school_name") == school.get("school_name")):
+                    document = candidate
+            except (OSError, ValueError):
+                pass
+            if document is None:
+                document = build_index_dict(school, snapshot.fingerprint)
+            index = CourseIndex(document)
+            self._indexes[key] = (snapshot.fingerprint, index)
+            return index
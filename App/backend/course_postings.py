@@ -0,0 +1,77 @@
+"""
+Course inverted index (.cidx) format, shared by the crawler's writer (Data/course_index.py)
+and the backend's reader (course_index.py). Data/ puts this directory on its import path
+so both sides build the index with the same code.
+
+The index is a JSON document mapping every course code to the majors, years and
+semesters that require it:
+
+    {"version": 1, "source_sha256": <sha256 of the transformed JSON>,
+     "school_name": ..., "majors": [major names],
+     "courses": [{"code": "MAT 231", "names": ["MAT 231 Calculus I"],
+                  "postings": [[major position, "freshman", "fall"], ...]}]}
+
+Courses are sorted by code and postings by major position.
+"""
+import os
+import re
+
+COURSE_INDEX_VERSION = 1
+
+# Curriculum years and semesters, in catalog order
+CLASSIFICATIONS = ["freshman", "sophomore", "junior", "senior"]
+SEMESTERS = ["fall", "spring"]
+
+# Course codes like "MAT 231", "EN 131", "ML_ 131" or "BIO 201L" at the start of a course string
+COURSE_CODE_PATTERN = re.compile(r'^[A-Z]{2,4}_?\s?\d{3}[A-Z]?\b')
+
+
+def course_index_path_for(json_path):
+    """The .cidx file that sits next to a transformed JSON file"""
+    return os.path.splitext(json_path)[0] + '.cidx'
+
+
+def course_code(course):
+    """The leading course code of a "CODE Name" course string, or the whole string"""
+    match = COURSE_CODE_PATTERN.match(course)
+    return match.group(0) if match else course
+
+
+class CourseIndexBuilder:
+    """
+    Collects course postings as majors stream past (see track()) and builds the index.
+    Postings are sorted by course code in to_dict(), so they are all held in memory until then.
+    """
+
+    def __init__(self, school_name):
+        self.school_name = school_name
+        self.majors = []
+        self.courses = {}
+
+    def add_major(self, major):
+        """Add one transformed major ({"name", "curriculum"})"""
+        position = len(self.majors)
+        self.majors.append(major["name"])
+        for classification in CLASSIFICATIONS:
+            year = major["curriculum"].get(classification) or {}
+            for semester in SEMESTERS:
+                for course in year.get(semester, []):
+                    entry = self.courses.setdefault(course_code(course).strip(), {"names": [], "postings": []})
+                    if course not in entry["names"]:
+                        entry["names"].append(course)
+                    entry["postings"].append([position, classification, semester])
+
+    def track(self, majors):
+        """Pass majors through unchanged while adding each one to the index"""
+        for major in majors:
+            self.add_major(major)
+            yield major
+
+    def to_dict(self, source_sha256):
+        return {
+            "version": COURSE_INDEX_VERSION,
+            "source_sha256": source_sha256,
+            "school_name": self.school_name,
+            "majors": self.majors,
+            "courses": [{"code": code, **self.courses[code]} for code in sorted(self.courses)]
+        }
@@ -0,0 +1,139 @@
+import threading
+
+import numpy as np
+
+from upstream import BudgetExhausted, UpstreamUnavailable, is_transient
+
+# tiktoken is optional; without it token counts are estimated from text length
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('cl100k_base')
+except Exception:
+    _encoding = None
+
+# OpenAI embeddings limits: inputs per request, and total tokens per request (kept under 300k)
+MAX_BATCH_ITEMS = 2048
+MAX_BATCH_TOKENS = 250000
+
+
+def count_tokens(text):
+    """Token count with the embedding models' tokenizer when available, otherwise ~4 characters per token"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def chunk_inputs(texts, max_items=MAX_BATCH_ITEMS, max_tokens=MAX_BATCH_TOKENS):
+    """Split texts into consecutive batches that respect the per-request item and token limits"""
+    batch = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if batch and (len(batch) >= max_items or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+class _Pending:
+    def __init__(self, text):
+        self.text = text
+        self.done = threading.Event()
+        self.vector = None
+        self.error = None
+
+
+class EmbeddingBatcher:
+    """
+    Batched front end for the embeddings endpoint.
+
+    `request_fn(inputs, model)` makes one upstream call and returns one vector per input,
+    in order. `embed_many` embeds a list with as few calls as the limits allow and returns
+    a float32 matrix. `embed` micro-batches: single texts arriving within `window` seconds
+    of each other (e.g. concurrent /recommend-majors requests) go out as one request, and
+    waits at most `timeout` seconds for it. If the upstream rejects a batch, each text is
+    retried on its own so one bad input only fails its own caller.
+    """
+
+    def __init__(self, request_fn, window=0.005, timeout=None, max_items=MAX_BATCH_ITEMS,
+                 max_tokens=MAX_BATCH_TOKENS):
+        self.request_fn = request_fn
+        self.window = window
+        self.timeout = timeout
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self.stats = {"texts": 0, "upstream_calls": 0}
+        self._pending = {}
+        self._flushing = 0
+        self._lock = threading.Lock()
+
+    def idle(self):
+        """True when no micro-batch is waiting for its window or in flight upstream"""
+        with self._lock:
+            return not self._pending and not self._flushing
+
+    def embed_many(self, texts, model):
+        """Return a (len(texts), dim) float32 matrix; duplicate texts are only sent once"""
+        unique = list(dict.fromkeys(texts))
+        vectors = {}
+        for batch in chunk_inputs(unique, self.max_items, self.max_tokens):
+            with self._lock:
+                self.stats["upstream_calls"] += 1
+                self.stats["texts"] += len(batch)
+            for text, vector in zip(batch, self.request_fn(batch, model)):
+                vectors[text] = vector
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.asarray([vectors[text] for text in texts], dtype=np.float32)
+
+    def embed(self, text, model):
+        """Embed one text, sharing an upstream call with any others submitted in the same window"""
+        pending = _Pending(text)
+        with self._lock:
+            queue = self._pending.get(model)
+            if queue is None:
+                queue = self._pending[model] = []
+                timer = threading.Timer(self.window, self._flush, args=(model,))
+                timer.daemon = True
+                timer.start()
+            queue.append(pending)
+        # The batch's upstream call only starts once the window has closed
+        if not pending.done.wait(None if self.timeout is None else self.window + self.timeout):
+            raise BudgetExhausted("Embedding batch did not finish within its time budget")
+        if pending.error is not None:
+            raise pending.error
+        return pending.vector
+
+    def _flush(self, model):
+        with self._lock:
+            queue = self._pending.pop(model, [])
+            if not queue:
+                return
+            self._flushing += 1
+        try:
+            matrix = self.embed_many([pending.text for pending in queue], model)
+            for pending, vector in zip(queue, matrix):
+                pending.vector = vector
+        except Exception as e:
+            if len(queue) > 1 and not (isinstance(e, UpstreamUnavailable) or is_transient(e)):
+                # The upstream refused the request itself; find out which input it objects to
+                self._embed_each(queue, model)
+            else:
+                for pending in queue:
+                    pending.error = e
+        finally:
+            with self._lock:
+                self._flushing -= 1
+            for pending in queue:
+                pending.done.set()
+
+    def _embed_each(self, queue, model):
+        for pending in queue:
+            try:
+                pending.vector = self.embed_many([pending.text], model)[0]
+            except Exception as e:
+                pending.error = e
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from similarity import SimilarityEngine
+
+# Bump when the on-disk layout of the index changes
+INDEX_FORMAT_VERSION = 3
+
+
+def school_key(school_name):
+    return school_name.strip().casefold()
+
+
+class _SchoolVectors:
+    """One published revision of a school's vectors and their row names, never mutated"""
+
+    def __init__(self, vectors, names, fingerprint):
+        self.vectors = vectors
+        self.rows = {name: i for i, name in enumerate(names)}
+        self.fingerprint = fingerprint
+        self.engines = {}
+
+
+class MajorEmbeddingIndex:
+    """
+    Persistent float32 matrices of major-name embeddings, one per school, keyed by major
+    and model.
+
+    Each school's vectors live in `<index_dir>/schools/<hash>.f32` (raw row-major float32)
+    and are memory-mapped read-only. A sidecar `<hash>.json` stores the model, the
+    dimension, the row names and the fingerprint of the catalog file they were built from,
+    so a school is only re-embedded when its data (or the model) changes, and syncing one
+    school never rewrites another's files.
+    `embed_batch_fn(names, model=...)`, if given, embeds all of a sync's new majors at once.
+
+    Readers take one reference to a school's current _SchoolVectors; a sync builds a
+    complete new one and publishes it with a single assignment, so lookups during a
+    background sync see either the old or the new vectors, never a mix.
+    """
+
+    def __init__(self, index_dir, model, embed_fn, embed_batch_fn=None):
+        self.index_dir = index_dir
+        self.model = model
+        self.embed_fn = embed_fn
+        self.embed_batch_fn = embed_batch_fn
+        self.schools_dir = os.path.join(index_dir, 'schools')
+        self._schools = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, key):
+        stem = hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]
+        return os.path.join(self.schools_dir, stem + '.f32'), os.path.join(self.schools_dir, stem + '.json')
+
+    def _load(self, key):
+        """Map a school's vectors from disk, or return None if it has no usable index yet"""
+        vectors_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if (meta.get("format_version") != INDEX_FORMAT_VERSION or meta.get("model") != self.model
+                    or meta.get("school") != key):
+                return None
+            names = meta["names"]
+            if names:
+                vectors = np.memmap(vectors_path, dtype=np.float32, mode='r', shape=(len(names), meta["dim"]))
+            else:
+                vectors = np.zeros((0, meta["dim"]), dtype=np.float32)
+        except (OSError, ValueError, KeyError):
+            return None
+        return _SchoolVectors(vectors, names, meta["fingerprint"])
+
+    def _school(self, key):
+        """The school's published vectors, loading them on first use"""
+        if key not in self._schools:
+            with self._lock:
+                if key not in self._schools:
+                    self._publish(key, self._load(key))
+        return self._schools[key]
+
+    def _publish(self, key, school):
+        # A new dict swapped in whole, so readers never see a half-updated mapping
+        schools = dict(self._schools)
+        schools[key] = school
+        self._schools = schools
+
+    def _write(self, key, names, vectors, fingerprint):
+        """Replace one school's files and publish the new vectors"""
+        dim = len(vectors[0]) if vectors else 0
+        if vectors:
+            matrix = np.vstack([np.asarray(vector, dtype=np.float32) for vector in vectors])
+        else:
+            matrix = np.zeros((0, dim), dtype=np.float32)
+
+        os.makedirs(self.schools_dir, exist_ok=True)
+        vectors_path, meta_path = self._paths(key)
+        # Write to temp files and swap in so a crash never leaves a half-written index
+        tmp_vectors = vectors_path + '.tmp'
+        tmp_meta = meta_path + '.tmp'
+        matrix.tofile(tmp_vectors)
+        meta = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "model": self.model,
+            "school": key,
+            "fingerprint": fingerprint,
+            "dim": dim,
+            "names": names
+        }
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        # The old memmap keeps the replaced file's data alive for readers still holding it
+        os.replace(tmp_vectors, vectors_path)
+        os.replace(tmp_meta, meta_path)
+        self._publish(key, self._load(key))
+
+    def sync_school(self, school_name, fingerprint, major_names):
+        """
+        Make sure a school's rows match the catalog identified by fingerprint.
+        Only majors without a stored vector are sent to the embedding service.
+        """
+        key = school_key(school_name)
+        if self.is_synced(school_name, fingerprint):
+            return
+        with self._lock:
+            current = self._schools.get(key)
+            if current is not None and current.fingerprint == fingerprint:
+                return
+            previous = {}
+            if current is not None:
+                # Copy rows out of the memmap before the file is replaced
+                previous = {name: np.array(current.vectors[i]) for name, i in current.rows.items()}
+
+            names = list(dict.fromkeys(major_names))
+            missing = [name for name in names if name not in previous]
+            if missing and self.embed_batch_fn is not None:
+                fresh = dict(zip(missing, self.embed_batch_fn(missing, model=self.model)))
+            else:
+                fresh = {name: self.embed_fn(name, model=self.model) for name in missing}
+
+            vectors = [previous[name] if name in previous else fresh[name] for name in names]
+            self._write(key, names, vectors, fingerprint)
+
+    def is_synced(self, school_name, fingerprint):
+        """True if the school's rows are already built from the catalog identified by fingerprint"""
+        school = self._school(school_key(school_name))
+        return school is not None and school.fingerprint == fingerprint
+
+    def _lookup(self, school, school_name, major_names):
+        if school is None:
+            raise KeyError(f"No embedding index for {school_name}")
+        missing = [name for name in major_names if name not in school.rows]
+        if missing:
+            raise KeyError(f"Majors missing from embedding index: {', '.join(missing)}")
+        positions = [school.rows[name] for name in major_names]
+        return np.asarray(school.vectors[positions], dtype=np.float32)
+
+    def lookup(self, school_name, major_names):
+        """Return a (len(major_names), dim) float32 matrix of stored vectors for a school's majors"""
+        return self._lookup(self._school(school_key(school_name)), school_name, major_names)
+
+    def similarity_engine(self, school_name, major_names):
+        """Return a cached SimilarityEngine over a school's majors"""
+        school = self._school(school_key(school_name))
+        cache_key = tuple(major_names)
+        engine = school.engines.get(cache_key) if school is not None else None
+        if engine is None:
+            engine = SimilarityEngine(major_names, self._lookup(school, school_name, major_names))
+            school.engines[cache_key] = engine
+        return engine
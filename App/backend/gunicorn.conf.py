@@ -0,0 +1,21 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:' + os.getenv('PORT', '5000'))
+
+# gevent workers multiplex many slow upstream calls per process (see wsgi.py)
+worker_class = 'gevent'
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(4, multiprocessing.cpu_count()))))
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', '1000'))
+
+# Each worker warms up after forking; the SQLite LLM cache connection must not be shared
+preload_app = False
+
+# LLM completions can take a while; keep client connections alive between requests
+timeout = int(os.getenv('WORKER_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,249 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+
+METRIC_PREFIX = "career_compass"
+
+# Latency buckets in seconds; the upper end covers slow LLM completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values, rendered in Prometheus text format"""
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ('le',)
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {series['count']}")
+        return lines
+
+
+request_duration = Histogram(f"{METRIC_PREFIX}_request_duration_seconds",
+                             "Time spent handling a request", ("route", "method"))
+request_phase_duration = Histogram(f"{METRIC_PREFIX}_request_phase_duration_seconds",
+                                   "Time spent in each phase of a request", ("route", "phase"))
+requests_total = Counter(f"{METRIC_PREFIX}_requests_total", "Requests handled", ("route", "method", "status"))
+upstream_duration = Histogram(f"{METRIC_PREFIX}_upstream_duration_seconds", "OpenAI API call latency", ("kind",))
+upstream_calls_total = Counter(f"{METRIC_PREFIX}_upstream_calls_total", "OpenAI API calls", ("kind", "outcome"))
+upstream_tokens_total = Counter(f"{METRIC_PREFIX}_upstream_tokens_total", "OpenAI tokens used", ("kind",))
+
+METRICS = [request_duration, request_phase_duration, requests_total,
+           upstream_duration, upstream_calls_total, upstream_tokens_total]
+
+
+class RequestTimings:
+    """Phase timings and upstream usage for the request being handled (stored on flask.g)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self.upstream_calls = 0
+        self.upstream_tokens = 0
+
+
+def _current():
+    if has_request_context():
+        return g.get('request_timings')
+    return None
+
+
+@contextmanager
+def phase(name):
+    """Time a block of the current request as a named phase (a no-op outside requests)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _current()
+        if timings is not None:
+            timings.phases.append((name, time.perf_counter() - started))
+
+
+class UpstreamCall:
+    def __init__(self):
+        self.tokens = 0
+
+    def record(self, response):
+        """Pick the token count out of an OpenAI response's usage block"""
+        usage = response.get('usage') if hasattr(response, 'get') else None
+        self.tokens = (usage or {}).get('total_tokens') or 0
+        return response
+
+
+@contextmanager
+def upstream_call(kind):
+    """
+    Count and time one OpenAI API call; call `.record(response)` on the yielded object
+    to count its tokens. Calls made outside a request (e.g. index warmup) are still counted.
+    """
+    call = UpstreamCall()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield call
+        outcome = "ok"
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, kind)
+        upstream_calls_total.inc(kind, outcome)
+        if call.tokens:
+            upstream_tokens_total.inc(kind, amount=call.tokens)
+        timings = _current()
+        if timings is not None:
+            timings.upstream_calls += 1
+            timings.upstream_tokens += call.tokens
+
+
+def server_timing_header(timings, total):
+    """Server-Timing value: one entry per phase (repeats merged), upstream usage and the total"""
+    merged = {}
+    for name, seconds in timings.phases:
+        merged[name] = merged.get(name, 0.0) + seconds
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in merged.items()]
+    if timings.upstream_calls:
+        entries.append(f'openai;desc="calls={timings.upstream_calls} tokens={timings.upstream_tokens}"')
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(entries)
+
+
+class RouteProfiler:
+    """
+    Opt-in profiler for hot routes: a sampled fraction of requests to the listed routes
+    run under cProfile, and each profile is dumped to `output_dir` for snakeviz/pstats.
+    Only one request is profiled at a time.
+    """
+
+    def __init__(self, routes, sample_rate, output_dir):
+        self.routes = set(routes)
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self._busy = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def maybe_start(self, route):
+        if route not in self.routes or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def finish(self, profiler, route):
+        try:
+            profiler.disable()
+            name = route.strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'root'
+            profiler.dump_stats(os.path.join(self.output_dir, f"{name}-{time.time():.6f}.prof"))
+        finally:
+            self._busy.release()
+
+
+def render_metrics(extra_lines=()):
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app, extra_metrics=None, profiler=None):
+    """
+    Time every request, add a Server-Timing header, record per-route metrics and serve
+    them at /metrics. `extra_metrics` is an optional callable returning more exposition
+    lines (e.g. cache gauges); `profiler` is an optional RouteProfiler.
+    """
+
+    @app.before_request
+    def start_request_timing():
+        g.request_timings = RequestTimings()
+        if profiler is not None and request.url_rule is not None:
+            g.route_profile = profiler.maybe_start(request.url_rule.rule)
+
+    @app.after_request
+    def finish_request_timing(response):
+        timings = g.pop('request_timings', None)
+        if timings is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        profile = g.pop('route_profile', None)
+        if profile is not None:
+            profiler.finish(profile, route)
+
+        total = time.perf_counter() - timings.started
+        request_duration.observe(total, route, request.method)
+        requests_total.inc(route, request.method, str(response.status_code))
+        for name, seconds in timings.phases:
+            request_phase_duration.observe(seconds, route, name)
+        response.headers['Server-Timing'] = server_timing_header(timings, total)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        extra = extra_metrics() if extra_metrics else ()
+        return Response(render_metrics(extra), mimetype='text/plain; version=0.0.4')
+
+    return app
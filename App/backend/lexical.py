@@ -0,0 +1,127 @@
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+from similarity import top_k_indices
+
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+STOPWORDS = frozenset("""
+a an and as at b ba bs by for from i ii iii in into is iv k of on or s the to v with
+""".split())
+# (suffix, replacement), tried in order; the first match wins
+SUFFIXES = (("ies", "y"), ("ing", ""), ("ment", ""), ("ed", ""), ("es", ""), ("s", ""))
+# Weight of a major's name relative to its course list
+NAME_WEIGHT = 2.0
+
+
+def stem(token):
+    """Very light suffix stripping so "teaching"/"teach" and "studies"/"study" match"""
+    if token.endswith("ss"):
+        # "stress"/"class" are not plurals; "stresses"/"classes" still lose "es" below
+        return token
+    for suffix, replacement in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            stemmed = token[:-len(suffix)] + replacement
+            # "programming"/"programmed" -> "program", but "spelling" keeps "spell" and "added" "add"
+            if (suffix in ("ing", "ed") and len(stemmed) > 3 and stemmed[-1] == stemmed[-2]
+                    and stemmed[-1] not in "aeioulsz"):
+                stemmed = stemmed[:-1]
+            return stemmed
+    return token
+
+
+def tokenize(text):
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.casefold()) if token not in STOPWORDS]
+
+
+def course_terms(major):
+    """Terms of every course in a major's curriculum"""
+    terms = []
+    for year in major.get('curriculum', {}).values():
+        for courses in year.values():
+            for course in courses:
+                terms += tokenize(course)
+    return terms
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of labelled documents.
+
+    Every term's per-document BM25 weight is computed once at build time and stored as a
+    posting list of (document ids, weights) arrays, so scoring a query only touches the
+    postings of its own terms.
+    """
+
+    def __init__(self, labels, documents, k1=1.2, b=0.75):
+        self.labels = list(labels)
+        counts = [Counter(terms) for terms in documents]
+        lengths = np.array([len(terms) for terms in documents], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        norms = k1 * (1 - b + b * lengths / average_length)
+
+        postings = {}
+        for doc_id, term_counts in enumerate(counts):
+            for term, tf in term_counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        n = len(self.labels)
+        self.postings = {}
+        for term, entries in postings.items():
+            idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            doc_ids = np.array([doc_id for doc_id, _ in entries], dtype=np.intp)
+            tfs = np.array([tf for _, tf in entries], dtype=np.float32)
+            self.postings[term] = (doc_ids, (idf * tfs * (k1 + 1) / (tfs + norms[doc_ids])).astype(np.float32))
+
+    def scores(self, query):
+        """BM25 score of the query text against every document"""
+        scores = np.zeros(len(self.labels), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores
+
+    def top_k(self, query, k=3):
+        scores = self.scores(query)
+        return [(self.labels[i], float(scores[i])) for i in top_k_indices(scores, k)]
+
+
+class MajorLexicalIndex:
+    """BM25 over major names and over their course lists, summed with the name field weighted up"""
+
+    def __init__(self, majors, name_weight=NAME_WEIGHT):
+        self.labels = [major['name'] for major in majors]
+        self.name_weight = name_weight
+        self.names = BM25Index(self.labels, [tokenize(major['name']) for major in majors])
+        self.courses = BM25Index(self.labels, [course_terms(major) for major in majors])
+
+    def scores(self, query):
+        return self.name_weight * self.names.scores(query) + self.courses.scores(query)
+
+    def top_k(self, query, k=3):
+        scores = self.scores(query)
+        return [(self.labels[i], float(scores[i])) for i in top_k_indices(scores, k)]
+
+
+def _rescale(scores):
+    """Map scores onto [0, 1] so lexical and cosine scores can be mixed"""
+    low, high = float(scores.min()), float(scores.max())
+    if high <= low:
+        return np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+
+def blend_scores(lexical, dense=None, dense_weight=0.6):
+    """
+    Hybrid score: dense_weight * rescaled cosine + (1 - dense_weight) * rescaled BM25.
+    Without dense scores (or with no lexical match at all) the other signal is used alone.
+    Callers must not rank the result when neither signal is available (all zeros).
+    """
+    if dense is None:
+        return lexical
+    if not lexical.any():
+        return np.asarray(dense, dtype=np.float32)
+    return dense_weight * _rescale(np.asarray(dense, dtype=np.float32)) + (1 - dense_weight) * _rescale(lexical)
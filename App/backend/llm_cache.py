@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_input(value):
+    """Case-fold strings and collapse whitespace so trivially different inputs share a key"""
+    if isinstance(value, str):
+        return re.sub(r'\s+', ' ', value).strip().casefold()
+    if isinstance(value, (list, tuple)):
+        return [normalize_input(v) for v in value]
+    if isinstance(value, dict):
+        return {k: normalize_input(v) for k, v in sorted(value.items())}
+    return value
+
+
+def make_cache_key(model, template_version, **inputs):
+    """Content address for an LLM response: hash of model, prompt template version and inputs"""
+    material = json.dumps({
+        "model": model,
+        "template_version": template_version,
+        "inputs": normalize_input(inputs)
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for parsed LLM responses.
+
+    A bounded in-memory LRU sits in front of a SQLite table; both tiers store the
+    JSON-serialized value with an expiry timestamp. Only successful, parsed responses
+    should be stored, so upstream errors are never cached. Expired rows stay on disk
+    until purge_expired(), so get_stale() can still serve them while the upstream is down.
+    """
+
+    def __init__(self, db_path, max_entries=512, ttl=7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Every get() counts exactly one of memory_hits, disk_hits, expired or misses, and
+        # every get_stale() one of stale_hits or stale_misses
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0,
+                         "stale_hits": 0, "stale_misses": 0, "stores": 0}
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return json.loads(entry[0])
+                # Another worker may have refreshed the disk row
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] > now:
+                self._remember(key, row[0], row[1])
+                self.counters["disk_hits"] += 1
+                return json.loads(row[0])
+
+            self.counters["expired" if entry is not None or row is not None else "misses"] += 1
+            return None
+
+    def get_stale(self, key):
+        """Return the stored value for key even if it has expired, or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value = entry[0]
+            else:
+                row = self._db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.counters["stale_misses"] += 1
+                    return None
+                value = row[0]
+            self.counters["stale_hits"] += 1
+            return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        """Store a JSON-serializable value under key"""
+        serialized = json.dumps(value, ensure_ascii=False)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, serialized, expires_at)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, serialized, expires_at)
+            )
+            self._db.commit()
+            self.counters["stores"] += 1
+
+    def purge_expired(self):
+        """Drop expired rows from the disk tier"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["expired"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
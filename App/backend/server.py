@@ -1,10 +1,26 @@
-from flask import Flask, request, send_from_directory,jsonify, Response
+from flask import Flask, request, send_from_directory,jsonify, Response, stream_with_context
 from flask_cors import CORS 
 import os
 import json
+import threading
+import time
 import openai
-import numpy as np
+from urllib.parse import quote_plus
 from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from embedding_index import MajorEmbeddingIndex
+from catalog import PROJECTIONS, CatalogStore, decode_cursor, fold
+from compact_catalog import CompactCatalogFiles
+from course_index import CourseIndexes
+from llm_cache import ResponseCache, make_cache_key
+import instrumentation
+from instrumentation import phase, upstream_call
+from streaming import NDJSON_MIMETYPE, IncrementalJSONScanner, ndjson_line
+from single_flight import SingleFlight
+from embedding_batcher import EmbeddingBatcher
+from lexical import MajorLexicalIndex, blend_scores
+from similarity import top_k_indices
+from upstream import Budget, UpstreamClient, UpstreamUnavailable, is_transient
 
 # Load environment variables from a .env file (optional)
 from dotenv import load_dotenv
@@ -23,6 +39,32 @@ CORS(app, resources={
 openai_api_key = os.getenv('OPENAI_API_KEY') or 'YOUR_OPENAI_API_KEY'
 openai.api_key = openai_api_key
 
+# Every OpenAI call goes through one client: a pooled keep-alive session, per-call time
+# budgets, jittered retries on transient errors and a circuit breaker per kind of call
+upstream_client = UpstreamClient(
+    pool_size=int(os.getenv('OPENAI_POOL_SIZE', '64')),
+    max_attempts=int(os.getenv('UPSTREAM_MAX_ATTEMPTS', '3')),
+    failure_threshold=int(os.getenv('UPSTREAM_FAILURE_THRESHOLD', '5')),
+    reset_timeout=float(os.getenv('UPSTREAM_RESET_TIMEOUT', '30'))
+)
+upstream_client.install()
+
+# Seconds a route may spend on its upstream calls, retries included. /recommend-majors
+# never waits longer than RECOMMEND_DEADLINE_MS; its embeddings get EMBEDDING_BUDGET.
+ROUTE_BUDGETS = {
+    '/learning-resources': float(os.getenv('LEARNING_RESOURCES_BUDGET', '20')),
+    '/additional-resources': float(os.getenv('ADDITIONAL_RESOURCES_BUDGET', '20'))
+}
+DEFAULT_ROUTE_BUDGET = 20.0
+EMBEDDING_BUDGET = float(os.getenv('EMBEDDING_BUDGET', '15'))
+
+def route_budget():
+    return Budget(ROUTE_BUDGETS.get(request.path, DEFAULT_ROUTE_BUDGET))
+
+def upstream_unavailable(error):
+    """True for failures that say nothing about the request itself: outages, timeouts, open circuits"""
+    return isinstance(error, UpstreamUnavailable) or is_transient(error)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_next_app(path):
@@ -40,35 +82,316 @@ def serve_next_app(path):
 def home():
     return 'Hello, Flask!'
 
+DATA_PATH = os.path.join(os.path.dirname(__file__), 'data.json')
+SCHOOLS_DIR = os.getenv('SCHOOL_DATA_DIR') or os.path.join(os.path.dirname(__file__), 'schools')
+
+# Catalog files are parsed once (lazily per school) and only re-read when they change.
+# data.json stays pinned in memory; per-school transformed files live in SCHOOLS_DIR.
+catalog_store = CatalogStore(SCHOOLS_DIR, pinned_paths=[DATA_PATH])
+catalog = catalog_store.pinned[DATA_PATH]
+
 @app.route('/api/data', methods=['GET'])
 def data():
+    """
+    The whole catalog, or with any of these query parameters a slice of one school:
+      school   school name (defaults to the school in data.json)
+      major    major name to include; repeat for several (names may contain commas)
+      fields   "full" (default) or "names" for {"name": ...} only
+      limit    page size; the response then carries "next_cursor" while majors remain
+      cursor   next_cursor from the previous page
+    """
+    args = request.args
+    sliced = any(name in args for name in ('school', 'major', 'fields', 'limit', 'cursor'))
+    school_name = (args.get('school') or default_school_name()) if sliced else None
+    if sliced and not school_name:
+        return jsonify({"error": "Invalid input. Please provide the school."}), 400
     try:
-        # Get the full path of the JSON file
-        json_path = os.path.join(os.path.dirname(__file__), 'data.json')
-
-        # Read the JSON file
-        with open(json_path, 'r') as json_file:
-            file_data = json.load(json_file)
-
-        # Return the JSON data
-        return jsonify(file_data)
+        with phase("catalog"):
+            snapshot = catalog_store.snapshot_for(school_name) if sliced else catalog.snapshot()
     except Exception as e:
         # Handle errors (e.g., file not found)
         return jsonify({"error": str(e)}), 500
+    if snapshot is None:
+        return jsonify({"error": f"Unknown school: {school_name}"}), 404
+
+    if sliced:
+        fields = args.get('fields', 'full')
+        if fields not in PROJECTIONS:
+            return jsonify({"error": f"fields must be one of: {', '.join(PROJECTIONS)}"}), 400
+        major_names = [name for name in args.getlist('major') if name.strip()]
+        try:
+            limit = positive_int(args.get('limit'), 'limit', None)
+            offset = decode_cursor(args['cursor'], snapshot.etag) if 'cursor' in args else 0
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    # Let the browser reuse its copy if the catalog hasn't changed. The tag is weak because
+    # the same catalog revision is sent gzip-, br- or un-encoded under one validator.
+    if request.if_none_match.contains_weak(snapshot.etag):
+        response = Response(status=304)
+    else:
+        with phase("encode"):
+            if sliced:
+                encoding, body = snapshot.query_payload(request.accept_encodings, school_name, fields,
+                                                        major_names, offset, limit)
+            else:
+                encoding, body = snapshot.payload(request.accept_encodings)
+        response = Response(body, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(snapshot.etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+# Per-major lookups read the memory-mapped .ccat file next to a catalog's JSON when it
+# is up to date, so only the requested major is decoded
+compact_catalogs = CompactCatalogFiles()
+
+def default_school_name():
+    """The school in data.json, when it holds exactly one"""
+    schools = list(catalog.snapshot().schools.values())
+    return schools[0].get("school_name") if len(schools) == 1 else None
+
+def positive_int(value, name, default):
+    """Parse a query or JSON field as a positive integer; raises ValueError with a message for the client"""
+    if value is None:
+        return default
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"{name} must be a positive integer.")
+    return value
+
+@app.route('/api/majors/<path:major_name>', methods=['GET'])
+def major_detail(major_name):
+    school_name = request.args.get('school') or default_school_name()
+    if not school_name:
+        return jsonify({'error': 'Invalid input. Please provide the school.'}), 400
+    path = catalog_store.path_for(school_name)
+    if path is None:
+        return jsonify({'error': 'School not found.'}), 404
+
+    try:
+        compact = compact_catalogs.get(path)
+        if compact is not None:
+            major = compact.major(major_name)
+        else:
+            major = catalog_store.major(school_name, major_name)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    if major is None:
+        return jsonify({'error': 'Major not found.'}), 404
+    return jsonify(major), 200
+
+# Course code -> majors inverted index per school, from the .cidx file next to the catalog
+course_indexes = CourseIndexes()
+
+def course_index_for(school_name):
+    """The CourseIndex for a school, or None if the school is unknown"""
+    path = catalog_store.path_for(school_name)
+    if path is None:
+        return None
+    return course_indexes.get(path, catalog_store.snapshot_for(school_name), fold(school_name))
+
+@app.route('/api/courses/search', methods=['GET'])
+def search_courses():
+    """Courses matching ?q= by code or name, with the majors, years and semesters requiring each"""
+    query = request.args.get('q', '')
+    school_name = request.args.get('school') or default_school_name()
+    if not query.strip():
+        return jsonify({'error': 'Invalid input. Please provide q.'}), 400
+    if not school_name:
+        return jsonify({'error': 'Invalid input. Please provide the school.'}), 400
+    try:
+        limit = positive_int(request.args.get('limit'), 'limit', 20)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with phase("index"):
+        index = course_index_for(school_name)
+        if index is None:
+            return jsonify({'error': 'School not found.'}), 404
+        courses = [index.course_record(course_id) for course_id in index.search(query, limit)]
+    return jsonify({'school_name': index.school_name, 'courses': courses}), 200
+
+@app.route('/api/courses/majors', methods=['GET'])
+def majors_requiring_courses():
+    """Majors that require every ?course= given (repeat the parameter for several)"""
+    requested = [course for course in request.args.getlist('course') if course.strip()]
+    school_name = request.args.get('school') or default_school_name()
+    if not requested:
+        return jsonify({'error': 'Invalid input. Please provide at least one course.'}), 400
+    if not school_name:
+        return jsonify({'error': 'Invalid input. Please provide the school.'}), 400
+    with phase("index"):
+        index = course_index_for(school_name)
+        if index is None:
+            return jsonify({'error': 'School not found.'}), 404
+        course_ids = [index.lookup(course) for course in requested]
+        unknown = [course for course, course_id in zip(requested, course_ids) if course_id is None]
+        majors = [] if unknown else [index.majors[major] for major in index.majors_requiring(course_ids)]
+    return jsonify({'school_name': index.school_name, 'majors': majors, 'unknown_courses': unknown}), 200
+
+@app.route('/api/courses/overlap', methods=['POST'])
+def course_overlap():
+    """Rank majors by overlap with a list of completed courses ({"courses": [...], "school"?, "limit"?})"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid input. Please send a JSON object.'}), 400
+    completed = data.get('courses')
+    school_name = data.get('school') or default_school_name()
+    if not isinstance(completed, list):
+        return jsonify({'error': 'Invalid input. Please provide a list of courses.'}), 400
+    if not isinstance(school_name, str):
+        return jsonify({'error': 'Invalid input. Please provide the school.'}), 400
+    try:
+        limit = positive_int(data.get('limit'), 'limit', 10)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with phase("index"):
+        index = course_index_for(school_name)
+        if index is None:
+            return jsonify({'error': 'School not found.'}), 404
+        course_ids = {index.lookup(course) for course in completed if isinstance(course, str)}
+        course_ids.discard(None)
+        ranked = index.overlap(course_ids, limit=limit)
+        majors = [{
+            'name': index.majors[major],
+            'overlap': count,
+            'total_courses': index.major_course_counts[major],
+            'coverage': round(count / index.major_course_counts[major], 4),
+            'matched_courses': index.course_codes(matched)
+        } for major, count, matched in ranked]
+    return jsonify({'school_name': index.school_name, 'matched': len(course_ids), 'majors': majors}), 200
 
 # Function to get embeddings
+# Identical upstream calls already in flight are shared instead of repeated
+embedding_flights = SingleFlight()
+llm_flights = SingleFlight()
+
+def request_embeddings(inputs, model):
+    """One upstream embeddings call for a list of inputs; vectors come back in input order"""
+    with upstream_call("embeddings") as call:
+        response = call.record(upstream_client.embeddings(Budget(EMBEDDING_BUDGET), inputs, model))
+    return [item['embedding'] for item in sorted(response['data'], key=lambda item: item['index'])]
+
+# Single texts submitted within EMBEDDING_BATCH_WINDOW seconds share one upstream call
+embedding_batcher = EmbeddingBatcher(request_embeddings, window=float(os.getenv('EMBEDDING_BATCH_WINDOW', '0.005')),
+                                     timeout=EMBEDDING_BUDGET)
+
 def get_embedding(text, model="text-embedding-ada-002"):
-    response = openai.Embedding.create(
-        input=[text],
-        model=model
-    )
-    return response['data'][0]['embedding']
+    return embedding_flights.do((model, text), lambda: embedding_batcher.embed(text, model))
+
+def get_embeddings(texts, model="text-embedding-ada-002"):
+    """Embed a list of texts in as few upstream calls as possible; returns a float32 matrix"""
+    return embedding_batcher.embed_many(texts, model)
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+INDEX_DIR = os.getenv('MAJOR_INDEX_DIR') or os.path.join(os.path.dirname(__file__), 'index')
+
+# Major-name embeddings are computed once per data.json revision and memory-mapped from disk
+major_index = MajorEmbeddingIndex(INDEX_DIR, EMBEDDING_MODEL, get_embedding, embed_batch_fn=get_embeddings)
+
+def load_major_index(school_name, major_names):
+    """Load the major embedding index, re-embedding the school if its catalog file changed"""
+    snapshot = catalog_store.snapshot_for(school_name)
+    major_index.sync_school(school_name, snapshot.fingerprint, major_names)
+    return major_index
+
+def warm_major_index():
+    """Map the index and bring every school in the pinned catalog files up to date"""
+    for pinned in catalog_store.pinned.values():
+        for school in pinned.snapshot().schools.values():
+            load_major_index(school["school_name"], [major['name'] for major in school.get("majors", [])])
+
+# /recommend-majors ranks majors with a precomputed BM25 index over each major's name and
+# courses. Embedding scores are blended in only when they are ready within the deadline;
+# embeddings that miss it keep being fetched in the background for the next request.
+RECOMMEND_DEADLINE = float(os.getenv('RECOMMEND_DEADLINE_MS', '50')) / 1000
+RECOMMEND_DENSE_WEIGHT = float(os.getenv('RECOMMEND_DENSE_WEIGHT', '0.6'))
+INTEREST_EMBEDDING_CACHE_SIZE = 1024
+recommend_pool = ThreadPoolExecutor(max_workers=int(os.getenv('RECOMMEND_WORKERS', '4')),
+                                    thread_name_prefix='recommend')
+interest_embeddings = OrderedDict()
+lexical_indexes = {}
+pending_index_syncs = set()
+background_futures = set()
+recommend_lock = threading.Lock()
+
+def submit_background(fn, *args):
+    """Run fn on recommend_pool, tracked so background_idle() can tell when it is done"""
+    future = recommend_pool.submit(fn, *args)
+    with recommend_lock:
+        background_futures.add(future)
+    future.add_done_callback(discard_background)
+    return future
+
+def discard_background(future):
+    with recommend_lock:
+        background_futures.discard(future)
+
+def background_idle():
+    """True when no background embedding work (index syncs, interest embeddings) is running"""
+    with recommend_lock:
+        if background_futures:
+            return False
+    return embedding_batcher.idle()
+
+def lexical_index_for(school, fingerprint):
+    """The school's BM25 index, rebuilt only when its catalog file changes"""
+    key = fold(school["school_name"])
+    cached = lexical_indexes.get(key)
+    if cached is None or cached[0] != fingerprint:
+        cached = lexical_indexes[key] = (fingerprint, MajorLexicalIndex(school.get("majors", [])))
+    return cached[1]
+
+def fetch_interest_embedding(text):
+    vector = get_embedding(text)
+    with recommend_lock:
+        interest_embeddings[text] = vector
+        while len(interest_embeddings) > INTEREST_EMBEDDING_CACHE_SIZE:
+            interest_embeddings.popitem(last=False)
+    return vector
+
+def interest_embedding(text):
+    """A future for the embedding of the interests text, already resolved if it was fetched before"""
+    with recommend_lock:
+        vector = interest_embeddings.get(text)
+        if vector is not None:
+            interest_embeddings.move_to_end(text)
+    if vector is None:
+        return submit_background(fetch_interest_embedding, text)
+    future = Future()
+    future.set_result(vector)
+    return future
+
+def dense_engine(school_name, fingerprint, major_names):
+    """
+    The school's SimilarityEngine if its major embeddings are indexed for this catalog
+    revision; otherwise None, after starting the indexing in the background.
+    """
+    if major_index.is_synced(school_name, fingerprint):
+        return major_index.similarity_engine(school_name, major_names)
+    if not upstream_client.available("embeddings"):
+        return None
+    key = fold(school_name)
+    with recommend_lock:
+        if key in pending_index_syncs:
+            return None
+        pending_index_syncs.add(key)
+
+    def sync():
+        try:
+            major_index.sync_school(school_name, fingerprint, major_names)
+        except Exception as e:
+            print(f"Embedding index sync failed for {school_name}: {e}")
+        finally:
+            with recommend_lock:
+                pending_index_syncs.discard(key)
 
-# Function to calculate cosine similarity
-def cosine_similarity(a, b):
-    a = np.array(a)
-    b = np.array(b)
-    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+    submit_background(sync)
+    return None
 
 @app.route('/recommend-majors', methods=['POST'])
 def recommend_majors():
@@ -84,58 +407,236 @@ def recommend_majors():
     # Combine user interests into a single string
     user_interests_text = ', '.join(user_interests)
 
-    # Fetch data from api/data endpoint
+    # Look the school up in the catalog store's name index
     try:
-        json_path = os.path.join(os.path.dirname(__file__), 'data.json')
-        with open(json_path, 'r') as json_file:
-            file_data = json.load(json_file)  # Load JSON data
-        universities_data = file_data  # Use the parsed JSON data directly
+        with phase("catalog"):
+            snapshot = catalog_store.snapshot_for(school_name)
+            school = snapshot.school(school_name) if snapshot else None
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-    # Ensure universities_data is a dictionary or list as expected
-    if isinstance(universities_data, dict):
-        if universities_data.get("school_name", "").lower() != school_name.lower():
-            return jsonify({'error': 'School not found.'}), 404
-        majors = universities_data.get("majors", [])
-    else:
-        school = next((uni for uni in universities_data if uni["school_name"].lower() == school_name.lower()), None)
-        if not school:
-            return jsonify({'error': 'School not found.'}), 404
-        majors = school.get("majors", [])
+    if not school:
+        return jsonify({'error': 'School not found.'}), 404
+    majors = school.get("majors", [])
 
     if not majors:
         return jsonify({'error': 'No majors found for the specified school.'}), 404
 
-    # Compute embedding for user's interests
-    try:
-        user_embedding = get_embedding(user_interests_text)
-    except Exception as e:
-        return jsonify({'error': f'OpenAI API error: {str(e)}'}), 500
+    # Ask for the interests' embedding first so it is fetched while lexical scoring runs
+    embedding = interest_embedding(user_interests_text)
+    deadline = time.monotonic() + RECOMMEND_DEADLINE
+    major_names = [major['name'] for major in majors]
 
-    # Compute embeddings and similarities for each major
-    similarities = []
-    for major in majors:
+    with phase("lexical"):
+        lexical = lexical_index_for(school, snapshot.fingerprint).scores(user_interests_text)
+
+    # Dense scores only count if both the major vectors and the interests' vector are ready in
+    # time. A late embedding keeps being fetched in the background and is cached for the next
+    # request, so even with no lexical match the upstream never holds up the response.
+    dense = None
+    with phase("embedding"):
         try:
-            major_name = major['name']
-            major_embedding = get_embedding(major_name)
-            similarity = cosine_similarity(user_embedding, major_embedding)
-            similarities.append({'major': major_name, 'similarity': similarity})
+            engine = dense_engine(school_name, snapshot.fingerprint, major_names)
+            if engine is not None:
+                dense = engine.scores(embedding.result(timeout=max(0.0, deadline - time.monotonic())))
+        except FutureTimeout:
+            pass
         except Exception as e:
-            return jsonify({'error': f'OpenAI API error: {str(e)}'}), 500
+            print(f"Embedding unavailable, using lexical scores only: {e}")
 
-    # Sort majors based on similarity
-    similarities.sort(key=lambda x: x['similarity'], reverse=True)
+    # Nothing to rank by: say so rather than returning the first majors in catalog order
+    if dense is None and not lexical.any():
+        return jsonify({
+            'school_name': school_name,
+            'recommended_majors': [],
+            'scoring': 'none',
+            'message': 'No majors matched these interests.'
+        }), 200
 
     # Get top 3 majors
-    top_majors = [item['major'] for item in similarities[:3]]
+    with phase("similarity"):
+        scores = blend_scores(lexical, dense, RECOMMEND_DENSE_WEIGHT)
+        top_majors = [major_names[i] for i in top_k_indices(scores, 3)]
 
     # Return the recommendations
-    return jsonify({
-        'school_name': school_name,
-        'recommended_majors': top_majors
-    }), 200
+    with phase("serialize"):
+        response = jsonify({
+            'school_name': school_name,
+            'recommended_majors': top_majors,
+            'scoring': 'lexical' if dense is None else 'hybrid'
+        })
+    return response, 200
+
+
+def chat_completion(budget, **kwargs):
+    """ChatCompletion.create, timed as the request's "llm" phase and counted as an upstream call"""
+    with phase("llm"), upstream_call("chat") as call:
+        return call.record(upstream_client.chat_completion(budget, **kwargs))
+
+def stream_chat_completion(budget, **kwargs):
+    """Yield the completion's text as it is generated"""
+    with upstream_call("chat"):
+        yield from upstream_client.stream_chat_completion(budget, **kwargs)
+
+def degraded_answer(cache_key, fallback):
+    """
+    What to send when the upstream is unavailable: the last cached answer even if it has
+    expired, else fallback() built without the LLM. Returns (kind, value).
+    """
+    stale = llm_cache.get_stale(cache_key)
+    if stale is not None:
+        return "stale", stale
+    return "fallback", fallback()
+
+def degraded_response(kind, value):
+    response = Response(json.dumps(value, ensure_ascii=False), mimetype='application/json')
+    response.headers['X-Upstream-Degraded'] = kind
+    return response
+
+def wants_stream():
+    """Clients opt into streaming with Accept: application/x-ndjson"""
+    return any(mimetype == NDJSON_MIMETYPE for mimetype, _ in request.accept_mimetypes)
+
+def event_line(event):
+    kind, key, value = event
+    record = {"event": kind}
+    if key is not None:
+        record["field"] = key
+    if kind != "array":
+        record["value"] = value
+    return ndjson_line(record)
+
+def replay_events(value):
+    """Turn a cached answer back into the events a streamed completion produces"""
+    if isinstance(value, list):
+        for item in value:
+            yield "item", None, item
+        return
+    for key, field_value in value.items():
+        if isinstance(field_value, list):
+            yield "array", key, None
+            for item in field_value:
+                yield "item", key, item
+        else:
+            yield "field", key, field_value
+
+def collect_events(events):
+    """Rebuild the complete answer (a list, or a dict of fields) from streamed events"""
+    fields = OrderedDict()
+    items = []
+    for kind, key, value in events:
+        if key is None:
+            items.append(value)
+        elif kind == "array":
+            fields[key] = []
+        elif kind == "item":
+            fields.setdefault(key, []).append(value)
+        else:
+            fields[key] = value
+    return fields if fields else items
+
+def stream_llm_response(cache_key, cached, completion, error_message, fallback, finish=None):
+    """
+    NDJSON response: one {"event": "item" | "field" | "array", ...} line per value, sent as
+    soon as it has been parsed out of the streaming completion, then {"event": "done"} or
+    {"event": "error"}. Cached answers are replayed the same way. The finished answer is
+    cached (after `finish` normalizes it) just as the non-streaming route would cache it.
+    If the upstream is unavailable before anything was sent, the degraded answer is
+    replayed instead and "done" carries "degraded": "stale" | "fallback".
+    """
+    budget = route_budget()
+
+    def produce():
+        scanner = IncrementalJSONScanner()
+        events = []
+        for text in stream_chat_completion(budget, **completion):
+            for event in scanner.feed(text):
+                events.append(event)
+                yield event
+        if not scanner.done:
+            raise ValueError("Incomplete JSON in API response")
+        value = collect_events(events)
+        llm_cache.set(cache_key, finish(value) if finish else value)
+
+    def generate():
+        if cached is not None:
+            for event in replay_events(cached):
+                yield event_line(event)
+            yield ndjson_line({"event": "done", "cached": True})
+            return
+
+        # Concurrent requests for the same answer all follow one upstream stream
+        sent = False
+        try:
+            for event in llm_flights.stream(cache_key, produce):
+                sent = True
+                yield event_line(event)
+        except Exception as e:
+            if sent or not upstream_unavailable(e):
+                yield ndjson_line({"event": "error", "error": f"{error_message}: {str(e)}"})
+                return
+            kind, value = degraded_answer(cache_key, fallback)
+            for event in replay_events(value):
+                yield event_line(event)
+            yield ndjson_line({"event": "done", "degraded": kind})
+            return
+        yield ndjson_line({"event": "done"})
+
+    response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Bump a template version whenever its prompt changes so stale answers aren't served
+LEARNING_RESOURCES_MODEL = "gpt-3.5-turbo"
+LEARNING_RESOURCES_PROMPT_VERSION = 1
+ADDITIONAL_RESOURCES_MODEL = "gpt-4o-mini"
+ADDITIONAL_RESOURCES_PROMPT_VERSION = 1
+
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH') or os.path.join(os.path.dirname(__file__), 'cache', 'llm_responses.sqlite3')
+llm_cache = ResponseCache(
+    LLM_CACHE_PATH,
+    max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512')),
+    ttl=int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))
+)
+
+def llm_cache_metrics():
+    """Expose the response cache counters alongside the request metrics"""
+    prefix = f"{instrumentation.METRIC_PREFIX}_llm_cache"
+    stats = llm_cache.stats()
+    lines = [f"# TYPE {prefix}_events_total counter"]
+    for event in ("memory_hits", "disk_hits", "misses", "expired", "stale_hits", "stale_misses", "stores"):
+        lines.append(f'{prefix}_events_total{{event="{event}"}} {stats[event]}')
+    lines += [f"# TYPE {prefix}_memory_entries gauge", f"{prefix}_memory_entries {stats['memory_entries']}"]
+    return lines
+
+def single_flight_metrics():
+    """Upstream calls made vs. requests that joined an identical call already in flight"""
+    name = f"{instrumentation.METRIC_PREFIX}_single_flight_total"
+    lines = [f"# TYPE {name} counter"]
+    for kind, flights in (("embeddings", embedding_flights), ("chat", llm_flights)):
+        for outcome, count in flights.stats.items():
+            lines.append(f'{name}{{kind="{kind}",outcome="{outcome}"}} {count}')
+    return lines
+
+# Per-request phase timings (Server-Timing header) and Prometheus metrics at /metrics.
+# Set PROFILE_ROUTES (e.g. "/recommend-majors,/learning-resources") to cProfile a
+# PROFILE_SAMPLE_RATE fraction of those requests into PROFILE_DIR.
+route_profiler = None
+if os.getenv('PROFILE_ROUTES'):
+    route_profiler = instrumentation.RouteProfiler(
+        [route.strip() for route in os.getenv('PROFILE_ROUTES').split(',') if route.strip()],
+        float(os.getenv('PROFILE_SAMPLE_RATE', '0.01')),
+        os.getenv('PROFILE_DIR') or os.path.join(os.path.dirname(__file__), 'profiles')
+    )
+def upstream_metrics():
+    """Retries, failures, rejected calls and circuit breaker state of the upstream client"""
+    return upstream_client.metrics(f"{instrumentation.METRIC_PREFIX}_upstream_client")
 
+instrumentation.init_app(app, extra_metrics=lambda: llm_cache_metrics() + single_flight_metrics() + upstream_metrics(),
+                         profiler=route_profiler)
 
 @app.route('/learning-resources', methods=['POST'])
 def learning_resources():
@@ -145,14 +646,20 @@ def learning_resources():
 
     major_name = data['major']
     prompt_additional_info = data.get('additional_info', '')
-    
-    # Call OpenAI API
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that provides learning resources for different majors."},
-                {"role": "user", "content": f"""Please provide learning resources for {major_name} major.
+
+    # Serve repeat questions from the response cache
+    cache_key = make_cache_key(LEARNING_RESOURCES_MODEL, LEARNING_RESOURCES_PROMPT_VERSION,
+                               major=major_name, additional_info=prompt_additional_info)
+    with phase("cache"):
+        cached = llm_cache.get(cache_key)
+    if cached is not None and not wants_stream():
+        return jsonify(cached), 200
+
+    completion = dict(
+        model=LEARNING_RESOURCES_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that provides learning resources for different majors."},
+            {"role": "user", "content": f"""Please provide learning resources for {major_name} major.
                     Additional context: {prompt_additional_info if prompt_additional_info else 'None'}
                     Return the response as a JSON array of 8 objects with this exact structure:
                     [
@@ -163,10 +670,21 @@ def learning_resources():
                         }}
                     ]
                     Include at least 4 high-quality resources with a mix of videos, books, websites, and courses."""}
-            ],
-            max_tokens=1000,
-            temperature=0.7,
-        )
+        ],
+        max_tokens=1000,
+        temperature=0.7,
+    )
+
+    fallback = lambda: degraded_learning_resources(major_name)
+
+    # Send each resource as soon as it has been generated
+    if wants_stream():
+        return stream_llm_response(cache_key, cached, completion, 'Error generating learning resources', fallback)
+
+    # Call OpenAI API
+    budget = route_budget()
+    try:
+        response = llm_flights.do(cache_key, lambda: chat_completion(budget, **completion))
 
         # Extract and parse the response
         assistant_reply = response['choices'][0]['message']['content'].strip()
@@ -176,13 +694,61 @@ def learning_resources():
             assistant_reply = assistant_reply.strip("```").strip("json").strip()
 
         resources = json.loads(assistant_reply)  # Parse sanitized JSON response
+        llm_cache.set(cache_key, resources)
         return jsonify(resources), 200
 
     except json.JSONDecodeError as e:
         return jsonify({'error': 'Invalid JSON format in API response', 'details': str(e)}), 500
     except Exception as e:
+        if upstream_unavailable(e):
+            return degraded_response(*degraded_answer(cache_key, fallback))
         return jsonify({'error': f'Error generating learning resources: {str(e)}'}), 500
 
+def degraded_learning_resources(major_name):
+    """Search links for the major, used when no LLM answer is available"""
+    query = quote_plus(major_name)
+    return [
+        {"title": f"{major_name} on YouTube", "type": "video",
+         "url": f"https://www.youtube.com/results?search_query={query}"},
+        {"title": f"{major_name} books on Open Library", "type": "book",
+         "url": f"https://openlibrary.org/search?q={query}"},
+        {"title": f"{major_name} on Khan Academy", "type": "website",
+         "url": f"https://www.khanacademy.org/search?page_search_query={query}"},
+        {"title": f"{major_name} courses on Coursera", "type": "course",
+         "url": f"https://www.coursera.org/search?query={query}"}
+    ]
+
+ADDITIONAL_RESOURCES_FIELDS = [
+    "resources_intro",
+    "resources",
+    "resume_tips_intro",
+    "resume_tips",
+    "internships_intro",
+    "internships"
+]
+
+def degraded_additional_resources(major_name):
+    """Template-shaped answer built from search links, used when no LLM answer is available"""
+    return order_major_info({
+        "resources_intro": "You can look at some additional resources to learn more:",
+        "resources": [f"{resource['title']}: {resource['url']}" for resource in degraded_learning_resources(major_name)],
+        "resume_tips_intro": "Here are some resume-building and interview preparation tips:",
+        "resume_tips": [],
+        "internships_intro": "Here are some types of internships available for this major and companies to apply to:",
+        "internships": [f"{major_name} internships on LinkedIn: "
+                        f"https://www.linkedin.com/jobs/search/?keywords={quote_plus(major_name + ' internship')}"]
+    })
+
+def order_major_info(major_info):
+    """Put the additional-resources fields in template order"""
+    odered_major_info = OrderedDict()
+    for field in ADDITIONAL_RESOURCES_FIELDS:
+        if field in major_info:
+            odered_major_info[field] = major_info[field]
+        else:
+            odered_major_info[field] = None # Handle missing fields as needed
+    return odered_major_info
+
 @app.route('/additional-resources', methods=['POST'])
 def additional_resources():
     data = request.get_json()
@@ -193,6 +759,13 @@ def additional_resources():
 
     major_name = data['major']
 
+    # Serve repeat questions from the response cache
+    cache_key = make_cache_key(ADDITIONAL_RESOURCES_MODEL, ADDITIONAL_RESOURCES_PROMPT_VERSION, major=major_name)
+    with phase("cache"):
+        cached = llm_cache.get(cache_key)
+    if cached is not None and not wants_stream():
+        return Response(json.dumps(cached, ensure_ascii=False), mimetype='application/json')
+
     # Construct the prompt
     prompt = f"""
 For the university major '{major_name}', please provide the following information in JSON format only, strictly
@@ -234,19 +807,30 @@ Please ensure:
 - Do not include any text before or after the JSON output.
 """
 
+    completion = dict(
+        model=ADDITIONAL_RESOURCES_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that provides information about university majors."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=500,
+        n=1,
+        stop=None,
+        temperature=0.7,
+    )
+
+    fallback = lambda: degraded_additional_resources(major_name)
+
+    # Send each resource, tip and internship as soon as it has been generated
+    if wants_stream():
+        return stream_llm_response(cache_key, cached, completion,
+                                   f'Error generating information for major {major_name}',
+                                   fallback, finish=order_major_info)
+
     # Call OpenAI API
+    budget = route_budget()
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that provides information about university majors."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            n=1,
-            stop=None,
-            temperature=0.7,
-        )
+        response = llm_flights.do(cache_key, lambda: chat_completion(budget, **completion))
 
         # Extract the assistant's reply
         assistant_reply = response['choices'][0]['message']['content'].strip()
@@ -256,29 +840,36 @@ Please ensure:
         print(f"Major info: {major_info}")
 
         # Ensure the fields are in the correct order using OrderedDict
-        odered_major_info = OrderedDict()
-        expected_fields = [
-            "resources_intro",
-            "resources",
-            "resume_tips_intro",
-            "resume_tips",
-            "internships_intro",
-            "internships"
-        ]
-
-        for field in expected_fields:
-            if field in major_info:
-                odered_major_info[field] = major_info[field]
-            else:
-                odered_major_info[field] = None # Handle missing fields as needed
+        odered_major_info = order_major_info(major_info)
         print(f"Ordered Major info: {odered_major_info}")
+        llm_cache.set(cache_key, odered_major_info)
 
     except Exception as e:
+        if upstream_unavailable(e):
+            return degraded_response(*degraded_answer(cache_key, fallback))
         return jsonify({'error': f'Error generating information for major {major_name}: {str(e)}'}), 500
 
     json_response = json.dumps(odered_major_info, ensure_ascii=False)
     # Return the additional resources
     return Response(json_response, mimetype='application/json')
 
+def warmup():
+    """Load the catalogs, pre-encode /api/data, build the lexical indexes and map the embedding index before serving"""
+    catalog_store.refresh()
+    catalog.snapshot().payloads
+    for path in catalog_store.pinned:
+        compact_catalogs.get(path)
+    for pinned in catalog_store.pinned.values():
+        snapshot = pinned.snapshot()
+        for school in snapshot.schools.values():
+            lexical_index_for(school, snapshot.fingerprint)
+    # Map the major embedding index up front so the first request doesn't pay for it
+    try:
+        warm_major_index()
+    except Exception as e:
+        print(f"Could not load major embedding index at startup: {e}")
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only; in production run gunicorn with gunicorn.conf.py (see wsgi.py)
+    warmup()
+    app.run(debug=os.getenv('FLASK_DEBUG', '1') == '1')
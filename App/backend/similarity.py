@@ -0,0 +1,62 @@
+import numpy as np
+
+
+def normalize_rows(matrix):
+    """Scale each row of a 2-D array to unit length (zero rows are left as zeros)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, k):
+    """Return the indices of the k highest scores along the last axis, best first"""
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape).copy()
+    # Only the k survivors get sorted
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+class SimilarityEngine:
+    """
+    Cosine-similarity scorer over a fixed set of labelled vectors.
+
+    Vectors are normalized once into an (N x D) float32 matrix, so scoring a query is a
+    single matrix-vector product and scoring a batch of queries is a single matrix product.
+    """
+
+    def __init__(self, labels, vectors):
+        self.labels = list(labels)
+        self.matrix = normalize_rows(vectors)
+        if self.matrix.shape[0] != len(self.labels):
+            raise ValueError("Number of labels does not match number of vectors")
+
+    def scores(self, query):
+        """Cosine similarity of one query vector against every row"""
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        return self.matrix @ query
+
+    def scores_batch(self, queries):
+        """Cosine similarity of each query (rows of a 2-D array) against every row"""
+        return normalize_rows(queries) @ self.matrix.T
+
+    def top_k(self, query, k=3):
+        """Return [(label, score), ...] for the k most similar rows, best first"""
+        scores = self.scores(query)
+        return [(self.labels[i], float(scores[i])) for i in top_k_indices(scores, k)]
+
+    def top_k_batch(self, queries, k=3):
+        """Return one top_k result list per query"""
+        scores = self.scores_batch(queries)
+        indices = top_k_indices(scores, k)
+        return [
+            [(self.labels[i], float(row_scores[i])) for i in row_indices]
+            for row_scores, row_indices in zip(scores, indices)
+        ]
@@ -0,0 +1,126 @@
+import threading
+
+
+class CancelledFlight(RuntimeError):
+    """Raised to waiting callers when the call they joined was cancelled (e.g. GreenletExit)"""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Broadcast:
+    """Items produced once, replayed to every subscriber as they arrive"""
+
+    def __init__(self):
+        self.items = []
+        self.finished = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def publish(self, item):
+        with self.cond:
+            self.items.append(item)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.finished = True
+            self.error = error
+            self.cond.notify_all()
+
+    def subscribe(self):
+        position = 0
+        while True:
+            with self.cond:
+                while position >= len(self.items) and not self.finished:
+                    self.cond.wait()
+                pending = self.items[position:]
+                finished, error = self.finished, self.error
+            for item in pending:
+                yield item
+            position += len(pending)
+            if finished and position >= len(self.items):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls: while a call for a key is in flight, later
+    callers with the same key wait for it and share its result (or exception) instead of
+    making their own. Nothing is remembered once the call finishes; caching is separate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = _Flight()
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        except BaseException:
+            # Don't re-raise the leader's cancellation in other callers, but never hand them None
+            flight.error = CancelledFlight("The shared upstream call was cancelled")
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            flight.done.set()
+
+    def stream(self, key, produce):
+        """
+        Iterate `produce()` once per key and fan its items out to every concurrent caller;
+        callers that join late first get the items produced so far. The producer runs on
+        its own thread, so it finishes (and e.g. caches its result) even if the client
+        that started it disconnects.
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is None:
+                broadcast = self._streams[key] = _Broadcast()
+                self.stats["calls"] += 1
+                threading.Thread(target=self._run_stream, args=(key, broadcast, produce), daemon=True).start()
+            else:
+                self.stats["coalesced"] += 1
+        return broadcast.subscribe()
+
+    def _run_stream(self, key, broadcast, produce):
+        error = None
+        try:
+            for item in produce():
+                broadcast.publish(item)
+        except Exception as e:
+            error = e
+        except BaseException:
+            error = CancelledFlight("The shared upstream stream was cancelled")
+            raise
+        finally:
+            with self._lock:
+                del self._streams[key]
+            broadcast.finish(error)
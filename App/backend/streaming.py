@@ -0,0 +1,128 @@
+import json
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+class IncrementalJSONScanner:
+    """
+    Pull complete values out of a JSON document while it is still being generated.
+
+    Feed it text deltas as they stream in from the LLM and it returns the events that
+    became complete:
+      top-level array:   ("item", None, value) for each element
+      top-level object:  ("array", key, None) when an array-valued field opens,
+                         ("item", key, value) for each of its elements, and
+                         ("field", key, value) for every other field
+    Anything before the first '[' or '{' (e.g. a ```json fence) or after the document
+    closes is ignored. Raises ValueError (json.JSONDecodeError) on malformed values.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._stack = []
+        self._root = None
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._key = None
+        self._after_colon = False
+        self._value_start = None
+        self._value_depth = None
+        self.done = False
+
+    def feed(self, text):
+        self._buffer += text
+        events = []
+        while self._pos < len(self._buffer) and not self.done:
+            self._step(self._buffer[self._pos], events)
+            self._pos += 1
+        return events
+
+    def _collecting(self, depth):
+        if self._root == '[':
+            return depth == 1
+        return (depth == 1 and self._after_colon) or depth == 2
+
+    def _start_value(self, depth):
+        self._value_start = self._pos
+        self._value_depth = depth
+
+    def _emit(self, events, end):
+        value = json.loads(self._buffer[self._value_start:end])
+        if self._root == '[':
+            events.append(("item", None, value))
+        elif self._value_depth == 2:
+            events.append(("item", self._key, value))
+        else:
+            events.append(("field", self._key, value))
+        self._value_start = None
+        self._after_colon = False
+
+    def _step(self, ch, events):
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif ch == '\\':
+                self._escaped = True
+            elif ch == '"':
+                self._in_string = False
+            return
+
+        if self._root is None:
+            if ch in '[{':
+                self._root = ch
+                self._stack.append(ch)
+            return
+
+        depth = len(self._stack)
+        if ch.isspace():
+            return
+
+        if ch == '"':
+            self._in_string = True
+            self._string_start = self._pos
+            if self._value_start is None and self._collecting(depth):
+                self._start_value(depth)
+            return
+
+        if ch == ':' and self._root == '{' and depth == 1:
+            # The key is the last string read at this depth
+            self._key = json.loads(self._buffer[self._string_start:self._pos].strip())
+            self._after_colon = True
+            return
+
+        if ch in '[{':
+            if self._root == '{' and depth == 1 and ch == '[' and self._value_start is None:
+                # Array-valued field: its elements are emitted one by one
+                events.append(("array", self._key, None))
+                self._after_colon = False
+            elif self._value_start is None and self._collecting(depth):
+                self._start_value(depth)
+            self._stack.append(ch)
+            return
+
+        if ch in ']}':
+            if self._value_start is not None and self._value_depth == depth:
+                # A scalar ended by its container closing
+                self._emit(events, self._pos)
+            self._stack.pop()
+            if self._value_start is not None and self._value_depth == len(self._stack):
+                # A nested array/object value just closed
+                self._emit(events, self._pos + 1)
+            if not self._stack:
+                self.done = True
+            return
+
+        if ch == ',':
+            if self._value_start is not None and self._value_depth == depth:
+                self._emit(events, self._pos)
+            return
+
+        # First character of a number, true, false or null
+        if self._value_start is None and self._collecting(depth):
+            self._start_value(depth)
+
+
+def ndjson_line(record):
+    return json.dumps(record, ensure_ascii=False) + '\n'
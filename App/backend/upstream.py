@@ -0,0 +1,238 @@
+import random
+import threading
+import time
+
+import openai
+import requests
+from openai import error as openai_error
+from requests.adapters import HTTPAdapter
+
+# Errors worth another attempt: the request may succeed if simply sent again
+TRANSIENT_ERRORS = (
+    openai_error.Timeout,
+    openai_error.APIConnectionError,
+    openai_error.RateLimitError,
+    openai_error.ServiceUnavailableError,
+    openai_error.TryAgain,
+)
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream call was not made or gave up; callers should degrade instead of waiting"""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class BudgetExhausted(UpstreamUnavailable):
+    pass
+
+
+def is_transient(error):
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    # Bare APIErrors are 5xx responses or unreadable bodies
+    return type(error) is openai_error.APIError and (error.http_status is None or error.http_status >= 500)
+
+
+class Budget:
+    """Wall-clock allowance for one logical upstream operation, retries included"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+
+class SharedSession(requests.Session):
+    """
+    A session shared by every thread. openai closes its per-thread session every few
+    minutes; on a shared one that would empty the connection pool for all callers, so
+    close() is a no-op.
+    """
+
+    def close(self):
+        pass
+
+
+class CircuitBreaker:
+    """
+    Closed until `failure_threshold` consecutive transient failures, then open: calls fail
+    immediately for `reset_timeout` seconds. After that a single trial call is let through
+    (half-open); its success closes the circuit again, its failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return
+        raise CircuitOpenError(f"{self.name} upstream is unavailable (circuit open)")
+
+    def available(self):
+        """True unless calls are currently being rejected"""
+        return self.state == "closed" or (self.state == "open" and
+                                          time.monotonic() - self.opened_at >= self.reset_timeout)
+
+    def end_trial(self):
+        """Let another half-open trial through; a no-op once the outcome has been recorded"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opens += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """
+    Shared OpenAI client: one pooled keep-alive session, per-call time budgets, jittered
+    exponential-backoff retries on transient errors and one circuit breaker per kind of
+    call ("chat", "embeddings").
+
+    Each attempt's connect and read timeouts are capped by what is left of the budget, and
+    a retry is only made if its backoff still fits in it, so a stalled upstream costs a
+    caller at most its budget instead of the client library's ten-minute default.
+    """
+
+    def __init__(self, pool_size=64, max_attempts=3, backoff_base=0.25, backoff_cap=4.0,
+                 failure_threshold=5, reset_timeout=30.0, connect_timeout=3.05):
+        self.session = SharedSession()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.connect_timeout = connect_timeout
+        self.breakers = {kind: CircuitBreaker(kind, failure_threshold, reset_timeout)
+                         for kind in ("chat", "embeddings")}
+        self.stats = {"attempts": 0, "retries": 0, "failures": 0, "rejected": 0, "budget_exhausted": 0}
+        self._lock = threading.Lock()
+
+    def install(self):
+        """Route the openai module's requests through the pooled session"""
+        openai.requestssession = self.session
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def available(self, kind):
+        return self.breakers[kind].available()
+
+    def _timeout(self, budget):
+        remaining = budget.remaining()
+        if remaining <= 0:
+            self._count("budget_exhausted")
+            raise BudgetExhausted("Upstream time budget exhausted")
+        return (min(self.connect_timeout, remaining), remaining)
+
+    def _backoff(self, attempt):
+        """Full jitter: a random wait up to the exponential backoff for this attempt"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def call(self, kind, budget, fn, **kwargs):
+        """
+        fn(request_timeout=..., **kwargs) with retries; raises UpstreamUnavailable when the
+        circuit is open or the budget runs out, otherwise the last upstream error.
+        """
+        breaker = self.breakers[kind]
+        for attempt in range(self.max_attempts):
+            timeout = self._timeout(budget)
+            try:
+                breaker.allow()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            self._count("attempts")
+            try:
+                result = fn(request_timeout=timeout, **kwargs)
+            except Exception as e:
+                if not is_transient(e):
+                    # The upstream answered; the request itself was bad
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                self._count("failures")
+                wait = self._backoff(attempt)
+                if attempt + 1 >= self.max_attempts or wait >= budget.remaining():
+                    raise
+                self._count("retries")
+                time.sleep(wait)
+                continue
+            else:
+                breaker.record_success()
+                return result
+            finally:
+                # Covers a BaseException (e.g. GreenletExit) that neither success nor failure saw
+                breaker.end_trial()
+
+    def chat_completion(self, budget, **kwargs):
+        return self.call("chat", budget, openai.ChatCompletion.create, **kwargs)
+
+    def stream_chat_completion(self, budget, **kwargs):
+        """
+        Yield the completion's text as it is generated. Only opening the stream is retried;
+        once text has been sent on, a failure is raised to the caller. The read timeout
+        still applies to every chunk, so a stalled stream fails instead of hanging.
+        """
+        chunks = self.call("chat", budget, openai.ChatCompletion.create, stream=True, **kwargs)
+        breaker = self.breakers["chat"]
+        try:
+            for chunk in chunks:
+                content = chunk['choices'][0].get('delta', {}).get('content')
+                if content:
+                    yield content
+        except TRANSIENT_ERRORS:
+            breaker.record_failure()
+            raise
+
+    def embeddings(self, budget, inputs, model):
+        return self.call("embeddings", budget, openai.Embedding.create, input=inputs, model=model)
+
+    def metrics(self, prefix):
+        """Prometheus lines for the retry counters and breaker states"""
+        with self._lock:
+            stats = dict(self.stats)
+        lines = [f"# TYPE {prefix}_events_total counter"]
+        for event, count in stats.items():
+            lines.append(f'{prefix}_events_total{{event="{event}"}} {count}')
+        lines.append(f"# TYPE {prefix}_circuit_open gauge")
+        for kind, breaker in self.breakers.items():
+            lines.append(f'{prefix}_circuit_open{{kind="{kind}"}} {0 if breaker.state == "closed" else 1}')
+        lines.append(f"# TYPE {prefix}_circuit_opens_total counter")
+        for kind, breaker in self.breakers.items():
+            lines.append(f'{prefix}_circuit_opens_total{{kind="{kind}"}} {breaker.opens}')
+        return lines
@@ -0,0 +1,33 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Workers are gevent-based: blocking socket I/O is monkey-patched to yield, so a request
+waiting on OpenAI holds a cheap greenlet instead of an OS thread, and one worker can keep
+hundreds of slow /learning-resources calls in flight over server.py's pooled keep-alive
+upstream session. Each worker warms up (catalogs, /api/data payloads, embedding index)
+before it accepts connections.
+"""
+from gevent import monkey
+
+# Must run before anything imports socket, ssl or threading
+monkey.patch_all()
+
+import fcntl
+import os
+
+from server import INDEX_DIR, app, warmup
+
+# gunicorn loads wsgi:app
+__all__ = ['app']
+
+# Serialize warmup across workers so only the first one (re)builds the embedding index
+# and the rest simply map the finished files
+os.makedirs(INDEX_DIR, exist_ok=True)
+with open(os.path.join(INDEX_DIR, '.warmup.lock'), 'w') as lock_file:
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    try:
+        warmup()
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
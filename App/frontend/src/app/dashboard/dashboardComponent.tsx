@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import { Book, Youtube, DollarSign, ChevronRight, ChevronLeft, Globe, Search } from 'lucide-react'
 import { Button } from '@/components/ui/button'
@@ -9,7 +9,6 @@ import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs'
 import Image from 'next/image'
 import Link from 'next/link'
 import { useDashboardStore } from '@/store/dashboardStore'
-import bethuneCookmanData from '@/bethune-cookman_university_transformed.json'
 import { Input } from '@/components/ui/input'
 import NavBar from '@/components/navbar'
 
@@ -22,9 +21,11 @@ const yearData = {
 
 type YearKey = keyof typeof yearData;
 
-const getYearData = (majorName: string) => {
-  const major = bethuneCookmanData.majors.find(m => m.name === majorName);
-  if (!major) return null;
+// One major's curriculum from the backend, instead of bundling the whole catalog
+const fetchYearData = async (majorName: string) => {
+  const response = await fetch(`http://localhost:5000/api/majors/${encodeURIComponent(majorName)}`)
+  if (!response.ok) return null;
+  const major = await response.json();
 
   return {
     Freshman: {
@@ -117,34 +118,73 @@ export default function DashboardComponent() {
   const [searchQuery, setSearchQuery] = useState('')
   const [isSearching, setIsSearching] = useState(false)
 
+  const resourcesRequest = useRef<AbortController | null>(null)
+
+  // Resources are streamed as NDJSON, one {"event": "item", "value": resource} line each,
+  // so they render one by one while the rest are still being generated
   const fetchResources = async (additionalInfo?: string) => {
+    resourcesRequest.current?.abort()
+    const controller = new AbortController()
+    resourcesRequest.current = controller
+
     try {
       const response = await fetch('http://localhost:5000/learning-resources', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Accept': 'application/x-ndjson',
         },
         body: JSON.stringify({
           major: selectedMajor,
           additional_info: additionalInfo || ''
         }),
+        signal: controller.signal,
       })
-      
-      const data = await response.json()
-      if (Array.isArray(data)) {
-        setResources(data)
+
+      if (!response.body || !response.headers.get('Content-Type')?.includes('application/x-ndjson')) {
+        const data = await response.json()
+        if (Array.isArray(data)) {
+          setResources(data)
+        }
+        return
+      }
+
+      setResources([])
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffered = ''
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffered += decoder.decode(value, { stream: true })
+        const lines = buffered.split('\n')
+        buffered = lines.pop() || ''
+        for (const line of lines) {
+          if (!line.trim()) continue
+          const event = JSON.parse(line)
+          if (event.event === 'item') {
+            setResources(previous => [...previous, event.value])
+          } else if (event.event === 'error') {
+            console.error('Error fetching resources:', event.error)
+          }
+        }
       }
     } catch (error) {
-      console.error('Error fetching resources:', error)
+      if ((error as Error).name !== 'AbortError') {
+        console.error('Error fetching resources:', error)
+      }
     }
   }
 
   useEffect(() => {
-    const yearData = getYearData(selectedMajor)
-    if (yearData) {
-      setCourseData(yearData)
-      fetchResources()
-    }
+    fetchYearData(selectedMajor)
+      .then(yearData => {
+        if (yearData) {
+          setCourseData(yearData)
+          fetchResources()
+        }
+      })
+      .catch(error => console.error('Error fetching major:', error))
   }, [selectedMajor])
 
   const handleSearch = () => {
@@ -43,6 +43,7 @@ export default function Onboarding() {
     setSelectedMajor,
     toggleInterest,
     fetchSuggestedMajors,
+    setAvailableMajors,
   } = useOnboardingStore()
 
   const interestOptions = [
@@ -74,6 +75,8 @@ export default function Onboarding() {
     if (isNextDisabled()) return
 
     if (step === 2) {
+      // Load the school's majors while the next question is answered
+      setAvailableMajors(school)
       setStep(3)
     } else if (step === 3) {
       if (knowsMajor) {
@@ -1,6 +1,5 @@
 import { create } from 'zustand'
 import { createJSONStorage, devtools, persist } from 'zustand/middleware'
-import majorsData from '../bethune-cookman_university_transformed.json'
 
 interface OnboardingState {
   // Current UI state
@@ -32,7 +31,7 @@ interface OnboardingState {
   // API and state management
   fetchSuggestedMajors: () => Promise<void>
   resetState: () => void
-  setAvailableMajors: (schoolName: string) => void
+  setAvailableMajors: (schoolName: string) => Promise<void>
 }
 
 interface MajorRecommendationResponse {
@@ -40,9 +39,6 @@ interface MajorRecommendationResponse {
   school_name: string;
 }
 
-// Get majors list once at initialization
-const allMajors = majorsData.majors.map(major => major.name)
-
 const initialState = {
   // UI state
   step: 0,
@@ -55,7 +51,7 @@ const initialState = {
   selectedMajor: null,
   interests: [],
   suggestedMajors: [],
-  availableMajors: allMajors  // Initialize with the majors list
+  availableMajors: []  // Loaded from /api/data once the school is known
 }
 
 export const useOnboardingStore = create<OnboardingState>()(
@@ -76,7 +72,7 @@ export const useOnboardingStore = create<OnboardingState>()(
         setError: (error) => set({ error }),
 
         // User choice actions
-        setSchool: (school) => set({ school }), // Simplified - no need to call setAvailableMajors
+        setSchool: (school) => set({ school }),
         setKnowsMajor: (knows) => set({ knowsMajor: knows }),
         setSelectedMajor: (major) => set({ selectedMajor: major }),
         toggleInterest: (interest) => set((state) => ({
@@ -149,10 +145,23 @@ export const useOnboardingStore = create<OnboardingState>()(
           localStorage.removeItem('onboarding-storage')
         },
 
-        // Add this with the other actions
-        setAvailableMajors: (schoolName: string) => {
-          const schoolMajors = majorsData.majors.map(major => major.name)
-          set({ availableMajors: schoolMajors })
+        // Load the school's major names (names only: a fraction of the full catalog)
+        setAvailableMajors: async (schoolName: string) => {
+          try {
+            let response = await fetch(`http://127.0.0.1:5000/api/data?${new URLSearchParams({ school: schoolName, fields: 'names' })}`)
+            if (response.status === 404) {
+              // Unrecognized school name: fall back to the default catalog
+              response = await fetch('http://127.0.0.1:5000/api/data?fields=names')
+            }
+            if (!response.ok) throw new Error('Failed to fetch majors')
+            const data = await response.json()
+            if (get().school === schoolName) {
+              set({ availableMajors: data.majors.map((major: { name: string }) => major.name) })
+            }
+          } catch (error) {
+            console.error('Error fetching majors:', error)
+            set({ error: error instanceof Error ? error.message : 'Failed to fetch majors' })
+          }
         },
 
         // Add this initialization effect
@@ -0,0 +1,181 @@
+import queue
+import random
+import threading
+import time
+
+from crawl_engine import TokenBucket
+
+# Rough completion size for one curriculum parse, used for tokens-per-minute budgeting
+COMPLETION_TOKEN_ESTIMATE = 1500
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error):
+    """True for HTTP 429 errors from the OpenAI client"""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    return type(error).__name__ == 'RateLimitError'
+
+
+def retry_after_seconds(error):
+    """Return the server's Retry-After hint in seconds, if it sent one"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    for header in ('retry-after-ms', 'retry-after'):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if header == 'retry-after-ms' else seconds
+    return None
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit that backs off on rate limiting (AIMD): every 429 halves the
+    number of requests allowed in flight, and each run of successes adds one back.
+    """
+
+    def __init__(self, max_limit, increase_after=5):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.increase_after = increase_after
+        self.active = 0
+        self.successes = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self.successes += 1
+            if self.successes >= self.increase_after and self.limit < self.max_limit:
+                self.limit += 1
+                self.successes = 0
+                self._cond.notify_all()
+
+    def on_rate_limited(self):
+        with self._cond:
+            self.limit = max(1, self.limit // 2)
+            self.successes = 0
+
+
+class AIParseStage:
+    """
+    Pipeline stage that runs LLM parses for queued pages on a pool of worker threads.
+
+    Crawl workers `submit()` jobs (dicts carrying at least a "prompt") as soon as a page
+    is parsed, so fetching and LLM calls overlap. Each job is run with `parse_fn(job)`;
+    rate-limit errors are retried with jittered exponential backoff while the adaptive
+    limiter lowers concurrency, and a token bucket keeps usage under `tokens_per_minute`.
+    `on_result(job, result)` is called from the worker thread as each job finishes.
+    `shared_slots` is an optional semaphore (e.g. a multiprocessing.Manager one) held
+    around every completion, to cap LLM concurrency across several crawler processes.
+    """
+
+    def __init__(self, parse_fn, concurrency=4, tokens_per_minute=None, max_retries=6,
+                 on_result=None, base_backoff=1.0, max_backoff=60.0, shared_slots=None):
+        self.parse_fn = parse_fn
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.on_result = on_result
+        self.shared_slots = shared_slots
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.limiter = AdaptiveConcurrency(concurrency)
+        self.token_budget = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+        self.stats = {"completed": 0, "failed": 0, "rate_limited": 0, "estimated_tokens": 0}
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def start(self):
+        for _ in range(self.concurrency):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, job):
+        job.setdefault("estimated_tokens", estimate_tokens(job.get("prompt", "")) + COMPLETION_TOKEN_ESTIMATE)
+        self._queue.put(job)
+
+    def close(self):
+        """Wait for every queued job to finish and stop the workers"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _backoff(self, attempt, error):
+        hint = retry_after_seconds(error)
+        if hint is not None:
+            return hint
+        delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            result = self._run(job)
+            self._count("completed" if result else "failed")
+            if self.on_result:
+                self.on_result(job, result)
+
+    def _run(self, job):
+        for attempt in range(self.max_retries + 1):
+            if self.token_budget:
+                self.token_budget.acquire(job["estimated_tokens"])
+                self._count("estimated_tokens", job["estimated_tokens"])
+            error = None
+            with self.limiter:
+                if self.shared_slots is not None:
+                    self.shared_slots.acquire()
+                try:
+                    result = self.parse_fn(job)
+                except Exception as e:
+                    error = e
+                finally:
+                    if self.shared_slots is not None:
+                        self.shared_slots.release()
+            if error is None:
+                self.limiter.on_success()
+                return result
+            if not is_rate_limit_error(error) or attempt == self.max_retries:
+                print(f"Error in AI parsing: {str(error)}")
+                return None
+            # Sleep outside the limiter so other workers keep their slots
+            self._count("rate_limited")
+            self.limiter.on_rate_limited()
+            time.sleep(self._backoff(attempt, error))
+        return None
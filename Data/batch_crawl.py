@@ -0,0 +1,166 @@
+"""
+Crawl many schools' catalogs in one command.
+
+    python batch_crawl.py schools.json --output-dir ../App/backend/schools
+
+The manifest is a JSON list of {"school_name": ..., "catalog_url": ...} objects, or a
+CSV file with school_name,catalog_url columns. Schools are crawled in parallel worker
+processes; schools hosted on the same domain are crawled one after another in the same
+process so per-domain politeness holds, and every process shares one global limit on
+concurrent LLM calls. Each school ends up as <slug>.ndjson (the checkpoint journal),
+<slug>_transformed.json, its compact <slug>_transformed.ccat and its course index
+<slug>_transformed.cidx in the output directory.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def load_manifest(path):
+    """Read [{"school_name", "catalog_url"}] from a JSON or CSV manifest"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            schools = list(csv.DictReader(f))
+        else:
+            schools = json.load(f)
+    for school in schools:
+        if not school.get("school_name") or not school.get("catalog_url"):
+            raise ValueError(f"Manifest entry needs school_name and catalog_url: {school}")
+    return schools
+
+
+def group_by_domain(schools):
+    """Group manifest entries by catalog host, preserving manifest order"""
+    groups = OrderedDict()
+    for school in schools:
+        groups.setdefault(urlparse(school["catalog_url"]).netloc, []).append(school)
+    return list(groups.values())
+
+
+def crawl_domain_group(schools, options, llm_slots):
+    """Worker process: crawl each school of one domain in turn and transform its output"""
+    # Imported here so the parent process never needs the crawler's dependencies loaded
+    from data_gatherer import CurriculumParser, school_slug
+    from json_transformer import process_file
+
+    summaries = []
+    for school in schools:
+        slug = school_slug(school["school_name"])
+        records_file = os.path.join(options["output_dir"], f"{slug}.ndjson")
+        transformed_file = os.path.join(options["output_dir"], f"{slug}_transformed.json")
+        started = time.time()
+        summary = {"school_name": school["school_name"], "ok": False}
+        try:
+            parser = CurriculumParser(
+                max_workers=options["crawl_workers"],
+                requests_per_second=options["requests_per_second"],
+                max_host_concurrency=options["max_host_concurrency"],
+                ai_concurrency=options["ai_concurrency"],
+                ai_tokens_per_minute=options["ai_tokens_per_minute"],
+                cache_path=os.path.join(options["output_dir"], f"{slug}_crawl_cache.sqlite3"),
+                ai_shared_slots=llm_slots
+            )
+            school_data = parser.process_school(
+                school["catalog_url"],
+                output_path=records_file,
+                resume=options["resume"],
+                school_name=school["school_name"]
+            )
+            if school_data:
+                process_file(records_file, transformed_file)
+                summary.update(ok=True, output=transformed_file, stats=school_data["processing_stats"])
+            else:
+                summary["error"] = "Could not fetch the main catalog page"
+        except Exception as e:
+            summary["error"] = str(e)
+        summary["seconds"] = round(time.time() - started, 1)
+        summaries.append(summary)
+    return summaries
+
+
+def run_batch(schools, options, processes=4, llm_concurrency=8, deadline=None):
+    """
+    Crawl every school in the manifest and return one summary per school.
+    Schools still running when `deadline` seconds have passed are stopped and reported
+    as unfinished; rerun with resume to pick them up from their checkpoint.
+    """
+    os.makedirs(options["output_dir"], exist_ok=True)
+    groups = group_by_domain(schools)
+    started = time.time()
+    summaries = []
+
+    with multiprocessing.Manager() as manager:
+        llm_slots = manager.BoundedSemaphore(llm_concurrency)
+        pool = multiprocessing.Pool(processes=min(processes, len(groups)) or 1)
+        try:
+            pending = [(group, pool.apply_async(crawl_domain_group, (group, options, llm_slots)))
+                       for group in groups]
+            for group, result in pending:
+                remaining = None if deadline is None else max(0.0, deadline - (time.time() - started))
+                try:
+                    summaries.extend(result.get(timeout=remaining))
+                except multiprocessing.TimeoutError:
+                    summaries.extend({"school_name": school["school_name"], "ok": False,
+                                      "error": "Deadline reached before the crawl finished"}
+                                     for school in group)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    return summaries
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Crawl many schools' catalogs in parallel")
+    arg_parser.add_argument('manifest', help="JSON or CSV list of school_name / catalog_url")
+    arg_parser.add_argument('--output-dir', default='schools', help="Where per-school files are written")
+    arg_parser.add_argument('--processes', type=int, default=4, help="Schools (domains) crawled in parallel")
+    arg_parser.add_argument('--llm-concurrency', type=int, default=8,
+                            help="Concurrent LLM calls allowed across all processes")
+    arg_parser.add_argument('--tokens-per-minute', type=int, default=200000,
+                            help="LLM token budget shared evenly between processes")
+    arg_parser.add_argument('--crawl-workers', type=int, default=4, help="Fetch threads per school")
+    arg_parser.add_argument('--requests-per-second', type=float, default=1.0, help="Per-domain request rate")
+    arg_parser.add_argument('--max-host-concurrency', type=int, default=2, help="Per-domain requests in flight")
+    arg_parser.add_argument('--deadline', type=float, help="Stop after this many seconds")
+    arg_parser.add_argument('--resume', action='store_true', help="Continue from each school's checkpoint")
+    args = arg_parser.parse_args()
+
+    schools = load_manifest(args.manifest)
+    # One worker per domain group at most; the token budget is split between those started
+    processes = max(1, min(args.processes, len(group_by_domain(schools))))
+    options = {
+        "output_dir": args.output_dir,
+        "crawl_workers": args.crawl_workers,
+        "requests_per_second": args.requests_per_second,
+        "max_host_concurrency": args.max_host_concurrency,
+        "ai_concurrency": args.llm_concurrency,
+        "ai_tokens_per_minute": max(1, args.tokens_per_minute // processes),
+        "resume": args.resume
+    }
+
+    print(f"Crawling {len(schools)} schools with {processes} processes...")
+    summaries = run_batch(schools, options, processes=processes,
+                          llm_concurrency=args.llm_concurrency, deadline=args.deadline)
+
+    print("\nBatch summary:")
+    for summary in summaries:
+        if summary["ok"]:
+            print(f"  OK     {summary['school_name']} -> {summary['output']} ({summary['seconds']}s)")
+        else:
+            print(f"  FAILED {summary['school_name']}: {summary.get('error')}")
+    failed = sum(1 for summary in summaries if not summary["ok"])
+    print(f"\n{len(summaries) - failed} of {len(summaries)} schools completed")
+
+
+if __name__ == "__main__":
+    main()
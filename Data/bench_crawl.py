@@ -0,0 +1,172 @@
+"""
+Offline benchmark for CurriculumParser.process_school.
+
+    python bench_crawl.py                          # synthetic 6 x 8 catalog
+    python bench_crawl.py --fixtures saved_catalog --index index.html --llm-latency 0.8
+
+Catalog HTML is served from a local HTTP server (a directory of saved pages, or a
+generated synthetic catalog), and parse_with_ai's OpenAI call is replaced by a
+deterministic fake with configurable latency, so runs need no network and no API key.
+Reports wall time, pages/sec, parse CPU time per page and peak RSS.
+"""
+import argparse
+import functools
+import http.server
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+# The parser insists on a key even though the fake LLM never uses it
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark-no-network')
+
+from data_gatherer import CurriculumParser
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def start_fixture_server(directory):
+    """Serve directory on a free localhost port; returns (server, base_url)"""
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+
+def write_synthetic_catalog(directory, colleges=6, majors_per_college=8, courses_per_semester=6):
+    """Generate a catalog shaped like a real one: nav boilerplate, semester tables and course lists"""
+    nav = '<nav>' + ''.join(f'<a href="/nav{i}.html">Menu item {i}</a>' for i in range(40)) + '</nav>'
+    footer = '<footer>' + 'Accreditation, privacy and contact information. ' * 20 + '</footer>'
+    college_links = ''.join(f'<li><a href="/college{c}.html">College of Subject {c}</a></li>' for c in range(colleges))
+    with open(os.path.join(directory, 'index.html'), 'w') as f:
+        f.write(f'<html><body>{nav}<h1>Academic Catalog</h1><ul>{college_links}</ul>{footer}</body></html>')
+
+    years = ['Freshman', 'Sophomore', 'Junior', 'Senior']
+    for c in range(colleges):
+        major_links = ''.join(f'<li><a href="/major{c}_{m}.html">Program {c}-{m}, B.S.</a></li>'
+                              for m in range(majors_per_college))
+        with open(os.path.join(directory, f'college{c}.html'), 'w') as f:
+            f.write(f'<html><body>{nav}<h1>College of Subject {c}</h1><ul>{major_links}</ul>{footer}</body></html>')
+        for m in range(majors_per_college):
+            sections = []
+            for y, year in enumerate(years):
+                for term in ('Fall', 'Spring'):
+                    rows = ''.join(
+                        f'<tr><td>SUB {100 * (y + 1) + k + (m % 10)}</td><td>Course {y}-{k} of program {m}</td><td>3</td></tr>'
+                        for k in range(courses_per_semester))
+                    sections.append(f'<h3>{year} Year {term} Semester</h3><table>{rows}</table>'
+                                    f'<p>Total credit hours: {3 * courses_per_semester}</p>')
+            advising = '<div class="sidebar">' + '<p>Advising note and general information.</p>' * 30 + '</div>'
+            with open(os.path.join(directory, f'major{c}_{m}.html'), 'w') as f:
+                f.write(f'<html><body>{nav}<h1>Program {c}-{m}, B.S.</h1>{"".join(sections)}{advising}{footer}</body></html>')
+
+
+class BenchmarkParser(CurriculumParser):
+    """CurriculumParser with a fake LLM and per-page parse CPU accounting"""
+
+    def __init__(self, llm_latency=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.llm_latency = llm_latency
+        self.parse_cpu_seconds = 0.0
+        self.pages_parsed = 0
+        self._bench_lock = threading.Lock()
+
+    def parse_curriculum_page(self, html_content):
+        # thread_time only counts this thread, so it stays accurate with concurrent workers
+        started = time.thread_time()
+        result = super().parse_curriculum_page(html_content)
+        elapsed = time.thread_time() - started
+        with self._bench_lock:
+            self.parse_cpu_seconds += elapsed
+            self.pages_parsed += 1
+        return result
+
+    def request_ai_parse(self, prompt):
+        if self.llm_latency:
+            time.sleep(self.llm_latency)
+        # Deterministic answer derived from the prompt header
+        header = prompt.strip().split('\n', 1)[0]
+        return {
+            "major_name": header,
+            "curriculum": {"freshman": {"fall": [{"code": "SUB 101", "name": "Course", "credits": "3"}], "spring": []}}
+        }
+
+
+def run_benchmark(base_url, llm_latency, parser_options, output_path=None):
+    parser = BenchmarkParser(llm_latency=llm_latency, **parser_options)
+    started = time.perf_counter()
+    school_data = parser.process_school(base_url, output_path=output_path, school_name="Benchmark University")
+    wall = time.perf_counter() - started
+    if not school_data:
+        raise RuntimeError(f"Could not fetch {base_url}")
+    pages = len(parser.processed_urls)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+    return {
+        "wall_seconds": round(wall, 3),
+        "pages_fetched": pages,
+        "pages_per_second": round(pages / wall, 2) if wall else None,
+        "majors_parsed": school_data["processing_stats"]["total_pages_processed"],
+        "parse_cpu_ms_per_page": round(1000 * parser.parse_cpu_seconds / parser.pages_parsed, 3) if parser.pages_parsed else None,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "prompt_tokens_before_compaction": school_data["processing_stats"].get("prompt_tokens_before_compaction"),
+        "prompt_tokens_after_compaction": school_data["processing_stats"].get("prompt_tokens_after_compaction")
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Offline CurriculumParser benchmark")
+    arg_parser.add_argument('--fixtures', help="Directory of saved catalog HTML (default: generate a synthetic catalog)")
+    arg_parser.add_argument('--index', default='index.html', help="Main catalog page, relative to --fixtures")
+    arg_parser.add_argument('--colleges', type=int, default=6)
+    arg_parser.add_argument('--majors-per-college', type=int, default=8)
+    arg_parser.add_argument('--llm-latency', type=float, default=0.5, help="Seconds the fake LLM takes per call")
+    arg_parser.add_argument('--workers', type=int, default=4)
+    arg_parser.add_argument('--ai-concurrency', type=int, default=4)
+    arg_parser.add_argument('--requests-per-second', type=float, default=50.0,
+                            help="Politeness limit; the local server needs none, so keep it high")
+    arg_parser.add_argument('--max-host-concurrency', type=int, default=4)
+    arg_parser.add_argument('--stream', action='store_true', help="Stream majors to NDJSON as in main()")
+    arg_parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        fixtures = args.fixtures
+        if not fixtures:
+            fixtures = os.path.join(scratch, 'catalog')
+            os.makedirs(fixtures)
+            write_synthetic_catalog(fixtures, args.colleges, args.majors_per_college)
+
+        server, root_url = start_fixture_server(fixtures)
+        try:
+            results = run_benchmark(
+                root_url + args.index.lstrip('/'),
+                args.llm_latency,
+                {
+                    "max_workers": args.workers,
+                    "ai_concurrency": args.ai_concurrency,
+                    "requests_per_second": args.requests_per_second,
+                    "max_host_concurrency": args.max_host_concurrency
+                },
+                output_path=os.path.join(scratch, 'bench.ndjson') if args.stream else None
+            )
+        finally:
+            server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("\nCrawl benchmark results:")
+        for key, value in results.items():
+            print(f"  {key:32} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Compact binary catalog (.ccat) writer.
+
+    python compact_catalog.py bethune-cookman_university_transformed.json
+
+Layout (little-endian, every section starts on an 8-byte boundary), version 1:
+
+    header       64 bytes: b"CCAT", u32 version, u32 school_name string id,
+                 u32 string count, u32 course count, u32 major count,
+                 u32 curriculum length, u32 reserved, 32-byte sha256 of the
+                 transformed JSON file this was built from
+    strings      u32[string count + 1] offsets, then the UTF-8 string data
+    courses      (u32 text string id, u32 code string id) per course
+    majors       (u32 name string id, u32 classification bit mask,
+                 u32[9] curriculum bounds) per major; semester slot
+                 k = 2 * classification + (0 fall, 1 spring) holds
+                 curriculum[bounds[k]:bounds[k + 1]]
+    curriculum   u32 course ids
+
+Every string (course text, course code, major and school names) is stored once, so a
+gen-ed course shared by every major costs four bytes per use. The backend memory-maps
+the file and decodes one major at a time (App/backend/compact_catalog.py).
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+
+# Curriculum and course code conventions are shared with the backend (see course_index.py)
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'App', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from course_postings import CLASSIFICATIONS, SEMESTERS, course_code
+
+CCAT_MAGIC = b"CCAT"
+CCAT_VERSION = 1
+HEADER_FORMAT = '<4s7I32s'
+
+
+def compact_path_for(json_path):
+    """The .ccat file that sits next to a transformed JSON file"""
+    return os.path.splitext(json_path)[0] + '.ccat'
+
+
+def _pad(data):
+    return data + b'\0' * (-len(data) % 8)
+
+
+class CompactCatalogBuilder:
+    """
+    Interns majors as they stream past (see track()) and writes them as one .ccat file.
+    The string table must come first in the file, so everything is held in memory until
+    write(): each distinct string once plus four bytes per course use.
+    """
+
+    def __init__(self, school_name):
+        self.strings = []
+        self.string_ids = {}
+        self.courses = []
+        self.course_ids = {}
+        self.majors = []
+        self.curriculum = []
+        self.school_name_id = self.intern(school_name)
+
+    def intern(self, text):
+        string_id = self.string_ids.get(text)
+        if string_id is None:
+            string_id = self.string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def course_id(self, course):
+        course_id = self.course_ids.get(course)
+        if course_id is None:
+            course_id = self.course_ids[course] = len(self.courses)
+            self.courses.append((self.intern(course), self.intern(course_code(course))))
+        return course_id
+
+    def add_major(self, major):
+        """Add one transformed major ({"name", "curriculum"})"""
+        mask = 0
+        bounds = [len(self.curriculum)]
+        for position, classification in enumerate(CLASSIFICATIONS):
+            year = major["curriculum"].get(classification)
+            if year is not None:
+                mask |= 1 << position
+            for semester in SEMESTERS:
+                for course in (year or {}).get(semester, []):
+                    self.curriculum.append(self.course_id(course))
+                bounds.append(len(self.curriculum))
+        self.majors.append((self.intern(major["name"]), mask, bounds))
+
+    def track(self, majors):
+        """Pass majors through unchanged while adding each one to the catalog"""
+        for major in majors:
+            self.add_major(major)
+            yield major
+
+    def to_bytes(self, source_sha256):
+        encoded = [text.encode('utf-8') for text in self.strings]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+
+        header = struct.pack(HEADER_FORMAT, CCAT_MAGIC, CCAT_VERSION, self.school_name_id,
+                             len(self.strings), len(self.courses), len(self.majors),
+                             len(self.curriculum), 0, bytes.fromhex(source_sha256))
+        sections = [
+            header,
+            _pad(struct.pack(f'<{len(offsets)}I', *offsets)),
+            _pad(b''.join(encoded)),
+            _pad(b''.join(struct.pack('<2I', *course) for course in self.courses)),
+            _pad(b''.join(struct.pack('<11I', name_id, mask, *bounds) for name_id, mask, bounds in self.majors)),
+            _pad(struct.pack(f'<{len(self.curriculum)}I', *self.curriculum))
+        ]
+        return b''.join(sections)
+
+    def write(self, path, source_path):
+        """Write the catalog, stamped with the sha256 of the JSON file it mirrors"""
+        with open(source_path, 'rb') as f:
+            source_sha256 = hashlib.sha256(f.read()).hexdigest()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.to_bytes(source_sha256))
+        os.replace(tmp_path, path)
+
+
+def write_compact_catalog(transformed_path, compact_path=None):
+    """Build the .ccat file for an existing transformed JSON file"""
+    with open(transformed_path, 'r', encoding='utf-8') as f:
+        school = json.load(f)
+    builder = CompactCatalogBuilder(school["school_name"])
+    for major in school["majors"]:
+        builder.add_major(major)
+    builder.write(compact_path or compact_path_for(transformed_path), transformed_path)
+
+
+if __name__ == "__main__":
+    write_compact_catalog(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,43 @@
+"""
+Course inverted index (.cidx) writer.
+
+    python course_index.py bethune-cookman_university_transformed.json
+
+The format and the builder live in App/backend/course_postings.py, which the backend
+also uses to load the index and answer course searches and overlap queries.
+"""
+import hashlib
+import json
+import os
+import sys
+
+# The backend is deployed on its own, so the shared format module lives there
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'App', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from course_postings import CourseIndexBuilder, course_index_path_for
+
+
+def write_index(builder, path, source_path):
+    """Write the index, stamped with the sha256 of the JSON file it was built from"""
+    with open(source_path, 'rb') as f:
+        source_sha256 = hashlib.sha256(f.read()).hexdigest()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(builder.to_dict(source_sha256), f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def write_course_index(transformed_path, index_path=None):
+    """Build the .cidx file for an existing transformed JSON file"""
+    with open(transformed_path, 'r', encoding='utf-8') as f:
+        school = json.load(f)
+    builder = CourseIndexBuilder(school["school_name"])
+    for major in school["majors"]:
+        builder.add_major(major)
+    write_index(builder, index_path or course_index_path_for(transformed_path), transformed_path)
+
+
+if __name__ == "__main__":
+    write_course_index(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+
+def content_hash(*parts):
+    """sha256 over the cleaned page text (plus any identifying parts such as major name)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class CrawlCache:
+    """
+    Persistent per-URL crawl state for incremental re-crawls.
+
+    For every fetched URL it keeps the ETag / Last-Modified validators and the
+    (zlib-compressed) body, so re-crawls can send conditional GETs and reuse the body
+    on a 304. For major pages it also keeps the hash of the cleaned page content and
+    the parsed AI result, so unchanged pages never go back to the LLM.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body BLOB,"
+            " content_hash TEXT,"
+            " result TEXT,"
+            " fetched_at REAL)"
+        )
+        self._db.commit()
+
+    def _row(self, url, columns):
+        with self._lock:
+            return self._db.execute(f"SELECT {columns} FROM pages WHERE url = ?", (url,)).fetchone()
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a previously fetched URL"""
+        row = self._row(url, "etag, last_modified, body IS NOT NULL")
+        if not row or not row[2]:
+            return {}
+        headers = {}
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def cached_body(self, url):
+        row = self._row(url, "body")
+        if not row or row[0] is None:
+            return None
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def store_page(self, url, headers, body):
+        """Remember a 200 response's validators and body"""
+        compressed = zlib.compress(body.encode('utf-8'))
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO pages (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified, "
+                "body = excluded.body, fetched_at = excluded.fetched_at",
+                (url, headers.get('ETag'), headers.get('Last-Modified'), compressed, time.time())
+            )
+            self._db.commit()
+
+    def cached_result(self, url, page_hash):
+        """Return the stored AI result for url if it was produced from identical content"""
+        row = self._row(url, "content_hash, result")
+        if not row or row[0] != page_hash or row[1] is None:
+            return None
+        return json.loads(row[1])
+
+    def store_result(self, url, page_hash, result):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO pages (url, content_hash, result, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET content_hash = excluded.content_hash, result = excluded.result",
+                (url, page_hash, json.dumps(result, ensure_ascii=False), time.time())
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursting up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available (at most the capacity), then take them"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostPoliteness:
+    """
+    Per-host request limits: a token bucket caps the request rate and a semaphore caps
+    how many requests to the same host can be in flight at once.
+    """
+
+    def __init__(self, requests_per_second=1.0, burst=1, max_concurrency=2):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self._buckets = {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _limits_for(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_concurrency)
+            return self._buckets[host], self._semaphores[host]
+
+    def request(self, url, send):
+        """Run send() once the host of url has a free slot and a token"""
+        bucket, semaphore = self._limits_for(urlparse(url).netloc)
+        with semaphore:
+            bucket.acquire()
+            return send()
+
+
+def make_session(pool_size=10, user_agent=None):
+    """requests.Session with a connection pool large enough to keep every worker's connection alive"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if user_agent:
+        session.headers['User-Agent'] = user_agent
+    return session
+
+
+class UrlRegistry:
+    """
+    Concurrency-safe record of crawled URLs.
+
+    A URL is claimed before it is fetched so two workers never fetch it at the same
+    time; it only moves to `processed` once the fetch succeeded.
+    """
+
+    def __init__(self, processed=None):
+        self.processed = processed if processed is not None else set()
+        self.in_flight = set()
+        self.skipped = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def claim(self, url):
+        with self._lock:
+            if url in self.processed or url in self.in_flight:
+                self.skipped['duplicate'] += 1
+                return False
+            self.in_flight.add(url)
+            return True
+
+    def release(self, url, succeeded):
+        with self._lock:
+            self.in_flight.discard(url)
+            if succeeded:
+                self.processed.add(url)
+
+    def __contains__(self, url):
+        with self._lock:
+            return url in self.processed
@@ -1,19 +1,32 @@
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
 from openai import OpenAI
 from urllib.parse import urljoin, urlparse
-import time
 import re
+import argparse
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from crawl_engine import HostPoliteness, UrlRegistry, make_session
+from ai_pipeline import AIParseStage
+from crawl_cache import CrawlCache, content_hash
+from html_extract import extract_page
+from prompt_compaction import compact_curriculum_text
+from ndjson_records import NDJSONWriter, prepare_resume
+from json_transformer import process_file
 
 # Load environment variables from .env file
 load_dotenv()
 
+def school_slug(school_name):
+    """File-name stem used for a school's output files"""
+    return school_name.lower().replace(' ', '_')
+
 class CurriculumParser:
-    def __init__(self):
+    def __init__(self, max_workers=4, requests_per_second=1.0, max_host_concurrency=2, timeout=30,
+                 ai_concurrency=4, ai_tokens_per_minute=200000, cache_path=None,
+                 prompt_token_budget=6000, ai_shared_slots=None):
 
          # Get OpenAI API key from environment variables
         openai_api_key = os.getenv('OPENAI_API_KEY')
@@ -22,13 +35,54 @@ class CurriculumParser:
         
         self.client = OpenAI(api_key=openai_api_key)
         self.base_url = None
-        # Track processed URLs to avoid duplicates
-        self.processed_urls = set()
+        # Track processed URLs to avoid duplicates (safe to share between crawl workers)
+        self.url_registry = UrlRegistry()
+        self.processed_urls = self.url_registry.processed
         # Track processed colleges and majors by name to avoid duplicates
         self.processed_colleges = set()
         self.processed_majors = defaultdict(set)  # {college_name: set(major_names)}
-        # Track circular references
-        self.current_path = []
+        # Track circular references (per worker thread)
+        self._local = threading.local()
+
+        # Crawl concurrency: a worker pool over one pooled keep-alive session, with
+        # per-host rate/concurrency limits instead of fixed sleeps between requests
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = make_session(pool_size=max(max_workers, max_host_concurrency))
+        self.politeness = HostPoliteness(
+            requests_per_second=requests_per_second,
+            max_concurrency=max_host_concurrency
+        )
+        # AI parsing stage limits (concurrent completions and tokens-per-minute budget)
+        self.ai_concurrency = ai_concurrency
+        self.ai_tokens_per_minute = ai_tokens_per_minute
+        self.ai_shared_slots = ai_shared_slots
+        # Optional persistent cache for conditional re-crawls and skipping unchanged LLM parses
+        self.crawl_cache = CrawlCache(cache_path) if cache_path else None
+        # Page text sent to the LLM is compacted to at most this many tokens
+        self.prompt_token_budget = prompt_token_budget
+        self.crawl_stats = {
+            "pages_not_modified": 0,
+            "ai_parses_reused": 0,
+            "prompt_tokens_before_compaction": 0,
+            "prompt_tokens_after_compaction": 0,
+            "majors_resumed": 0
+        }
+        self._stats_lock = threading.Lock()
+        # NDJSON writer for the school currently being streamed, if any
+        self.output_writer = None
+        # Major page URLs already parsed by an earlier, interrupted run (--resume)
+        self.completed_urls = set()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.crawl_stats[key] += amount
+
+    @property
+    def current_path(self):
+        if not hasattr(self._local, 'path'):
+            self._local.path = []
+        return self._local.path
         
     def is_valid_url(self, url):
         """Check if URL is valid and belongs to the same domain"""
@@ -49,38 +103,47 @@ class CurriculumParser:
             print(f"Skipping invalid or external URL: {url}")
             return None
             
-        if url in self.processed_urls:
-            print(f"Skipping already processed URL: {url}")
-            return None
-            
         if self.is_circular_reference(url):
             print(f"Detected circular reference, skipping: {url}")
             return None
+
+        # Claiming the URL keeps concurrent workers from fetching it twice
+        if not self.url_registry.claim(url):
+            print(f"Skipping already processed URL: {url}")
+            return None
             
+        succeeded = False
         try:
             self.current_path.append(url)
-            response = requests.get(url)
-            response.raise_for_status()
-            self.processed_urls.add(url)
-            return response.text
+            # Re-crawls send the stored validators and reuse the cached body on a 304
+            headers = self.crawl_cache.conditional_headers(url) if self.crawl_cache else {}
+            response = self.politeness.request(
+                url, lambda: self.session.get(url, headers=headers, timeout=self.timeout))
+            if response.status_code == 304 and headers:
+                body = self.crawl_cache.cached_body(url)
+                self._count("pages_not_modified")
+            else:
+                response.raise_for_status()
+                body = response.text
+                if self.crawl_cache:
+                    self.crawl_cache.store_page(url, response.headers, body)
+            succeeded = body is not None
+            return body
         except Exception as e:
             print(f"Error fetching URL {url}: {str(e)}")
             return None
         finally:
             self.current_path.pop()
+            self.url_registry.release(url, succeeded)
 
     def extract_college_links(self, html_content):
         """Extract links to all colleges from the main page"""
-        soup = BeautifulSoup(html_content, 'html.parser')
         college_links = []
         
         # Look for college links in the sidebar or main content
-        potential_colleges = soup.find_all('a')
+        potential_colleges = extract_page(html_content)['links']
         
-        for link in potential_colleges:
-            text = link.get_text().strip()
-            href = link.get('href')
-            
+        for text, href in potential_colleges:
             # Skip if we've already processed this college
             if text in self.processed_colleges:
                 continue
@@ -99,14 +162,10 @@ class CurriculumParser:
 
     def extract_major_links(self, college_page_content, college_url, college_name):
         """Extract links to all majors within a college"""
-        soup = BeautifulSoup(college_page_content, 'html.parser')
         major_links = []
         
         # Look for program/major links
-        for link in soup.find_all('a'):
-            href = link.get('href')
-            text = link.get_text().strip()
-            
+        for text, href in extract_page(college_page_content)['links']:
             # Skip if we've already processed this major for this college
             if text in self.processed_majors[college_name]:
                 continue
@@ -128,43 +187,11 @@ class CurriculumParser:
 
     def parse_curriculum_page(self, html_content):
         """Parse individual curriculum page content"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Remove navigation elements, headers, footers, etc.
-        for element in soup.select('nav, header, footer, script, style'):
-            element.decompose()
-            
-        # Extract course tables or lists
-        course_content = []
-        
-        # Look for tables containing course information
-        tables = soup.find_all('table')
-        for table in tables:
-            course_content.append(table.get_text(separator=' ', strip=True))
-            
-        # Look for lists containing course information
-        lists = soup.find_all(['ul', 'ol'])
-        for list_elem in lists:
-            if any(course_indicator in list_elem.get_text().lower() 
-                  for course_indicator in ['credit', 'course', 'semester']):
-                course_content.append(list_elem.get_text(separator=' ', strip=True))
-                
-        # Look for specific course sections
-        course_sections = soup.find_all(class_=lambda x: x and any(
-            term in (x.lower() if x else '') 
-            for term in ['course', 'curriculum', 'semester', 'year']))
-        for section in course_sections:
-            course_content.append(section.get_text(separator=' ', strip=True))
-        
-        # Get any remaining text that might contain course information
-        main_content = soup.get_text(separator='\n')
-        
-        # Combine all content
-        all_content = '\n'.join(course_content + [main_content])
-        
-        # Clean up the text
-        lines = [line.strip() for line in all_content.split('\n') if line.strip()]
-        cleaned_content = '\n'.join(lines)
+        # One lxml pass strips boilerplate and collapses course tables, course lists and
+        # course sections into single de-duplicated lines, kept next to their headings,
+        # so table text no longer appears twice in the prompt
+        page = extract_page(html_content)
+        cleaned_content = '\n'.join(page['lines'])
         
         # Extract prerequisites information
         prereq_pattern = r'prerequisite.*?:|pre-req.*?:|pre:.*?'
@@ -174,9 +201,15 @@ class CurriculumParser:
             'main_content': cleaned_content,
             'prerequisites': prerequisites
         }
-    def parse_with_ai(self, curriculum_data, college_name, major_name):
-        """Use OpenAI to parse the curriculum text into structured data"""
-        prompt = f"""
+    def build_ai_prompt(self, curriculum_data, college_name, major_name):
+        """Build the curriculum parsing prompt for one major"""
+        # Keep only curriculum-looking lines, within the per-request token budget
+        page_text, tokens_before, tokens_after = compact_curriculum_text(
+            curriculum_data.get('main_content', ''), self.prompt_token_budget)
+        self._count("prompt_tokens_before_compaction", tokens_before)
+        self._count("prompt_tokens_after_compaction", tokens_after)
+
+        return f"""
         Parse the following curriculum text for {college_name}, {major_name} into this JSON structure:
         {{
             "college_name": "{college_name}",
@@ -215,29 +248,99 @@ class CurriculumParser:
 
 
         Text content to parse:
-        {curriculum_data.get('main_content', '')}
+        {page_text}
         """
-        
+
+    def request_ai_parse(self, prompt):
+        """Send a curriculum prompt to OpenAI; errors (including rate limits) are raised"""
+        response = self.client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "You are a curriculum parsing assistant specializing in university academic programs."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={ "type": "json_object" }
+        )
+        return json.loads(response.choices[0].message.content)
+
+    def parse_with_ai(self, curriculum_data, college_name, major_name):
+        """Use OpenAI to parse the curriculum text into structured data"""
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a curriculum parsing assistant specializing in university academic programs."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={ "type": "json_object" }
-            )
-            
-            return json.loads(response.choices[0].message.content)
+            return self.request_ai_parse(self.build_ai_prompt(curriculum_data, college_name, major_name))
         except Exception as e:
             print(f"Error in AI parsing: {str(e)}")
             return None
 
-    def process_school(self, base_url):
-        """Process entire school curriculum data"""
+    def crawl_major(self, college_name, major, ai_stage, slot):
+        """Fetch and parse one major page, then hand it to the AI stage"""
+        if major['url'] in self.completed_urls:
+            # Claim the URL so links to the same page from other colleges stay duplicates
+            if not self.url_registry.claim(major['url']):
+                return
+            self.url_registry.release(major['url'], True)
+            print(f"Already parsed in a previous run, skipping: {major['name']}")
+            self._count("majors_resumed")
+            slot["fetched"] = True
+            slot["status"] = "parsed"
+            return
+
+        print(f"Processing major: {major['name']}")
+        major_content = self.get_page_content(major['url'])
+        if not major_content:
+            return
+        slot["fetched"] = True
+        parsed_content = self.parse_curriculum_page(major_content)
+
+        # Skip the LLM entirely when the cleaned content is unchanged since the last crawl
+        slot["url"] = major['url']
+        slot["content_hash"] = content_hash(parsed_content['main_content'], college_name, major['name'])
+        if self.crawl_cache:
+            cached = self.crawl_cache.cached_result(major['url'], slot["content_hash"])
+            if cached:
+                print(f"Content unchanged, reusing parsed result: {major['name']}")
+                self._count("ai_parses_reused")
+                self._finish_major(slot, cached)
+                return
+
+        slot["prompt"] = self.build_ai_prompt(parsed_content, college_name, major['name'])
+        ai_stage.submit(slot)
+
+    def _record_ai_result(self, job, result):
+        """Called by AI workers as each major finishes"""
+        status = "parsed" if result else "failed"
+        print(f"AI {status}: {job['major_name']}")
+        if result and self.crawl_cache:
+            self.crawl_cache.store_result(job["url"], job["content_hash"], result)
+        self._finish_major(job, result)
+
+    def _finish_major(self, slot, result):
+        """Record a finished major; when streaming it goes straight to disk instead of memory"""
+        slot.pop("prompt", None)
+        slot["status"] = "parsed" if result else "failed"
+        if self.output_writer is None:
+            slot["result"] = result
+        elif result:
+            self.output_writer.write({
+                "type": "major",
+                "college_name": slot["college_name"],
+                "url": slot["url"],
+                "position": slot["position"],
+                "major": result
+            })
+
+    def process_school(self, base_url, output_path=None, resume=False, school_name="Bethune-Cookman University"):
+        """
+        Process entire school curriculum data.
+
+        With output_path, every major is appended to that NDJSON file the moment it is
+        parsed (see ndjson_records.py) and is not kept in the returned school_data, so
+        memory stays flat and a crashed crawl keeps everything finished so far.
+        With resume=True an existing output_path is used as a checkpoint journal: majors
+        it already holds are neither fetched nor sent to the LLM again.
+        """
         self.base_url = base_url
         school_data = {
-            "school_name": "Bethune-Cookman University",
+            "school_name": school_name,
             "colleges": [],
             "processing_stats": {
                 "total_pages_processed": 0,
@@ -251,85 +354,141 @@ class CurriculumParser:
         main_content = self.get_page_content(base_url)
         if not main_content:
             return None
-            
+
+        if output_path:
+            completed_urls = prepare_resume(output_path) if resume else None
+            if completed_urls is not None:
+                print(f"Resuming: {len(completed_urls)} majors already parsed in {output_path}")
+                self.completed_urls = completed_urls
+                self.output_writer = NDJSONWriter(output_path, mode='a')
+            else:
+                self.output_writer = NDJSONWriter(output_path)
+                self.output_writer.write({"type": "school", "school_name": school_data["school_name"]})
+        try:
+            self._crawl_colleges(main_content, school_data)
+        finally:
+            if self.output_writer:
+                self.output_writer.close()
+                self.output_writer = None
+        return school_data
+
+    def _crawl_colleges(self, main_content, school_data):
+        """Crawl every college and major linked from the main page into school_data"""
         # Get all college links
         college_links = self.extract_college_links(main_content)
         
-        # Process each college
-        for college in college_links:
-            print(f"\nProcessing college: {college['name']}")
-            college_data = {
-                "name": college['name'],
-                "majors": []
-            }
-            
-            # Get college page content
-            college_content = self.get_page_content(college['url'])
-            if college_content:
-                # Get all major links for this college
-                major_links = self.extract_major_links(college_content, college['url'], college['name'])
-                
-                # Process each major
-                for major in major_links:
-                    print(f"Processing major: {major['name']}")
-                    major_content = self.get_page_content(major['url'])
-                    if major_content:
-                        parsed_content = self.parse_curriculum_page(major_content)
-                        major_data = self.parse_with_ai(
-                            parsed_content,
-                            college['name'],
-                            major['name']
-                        )
-                        if major_data:
-                            college_data["majors"].append(major_data)
-                            school_data["processing_stats"]["total_pages_processed"] += 1
-                        else:
-                            school_data["processing_stats"]["failed_pages"] += 1
-                    time.sleep(1)  # Be nice to the server
-                    
-            school_data["colleges"].append(college_data)
-            time.sleep(1)  # Be nice to the server
-            
+        # Crawl workers fetch and clean pages and feed them to the AI stage, which
+        # runs completions concurrently so fetching and parsing overlap
+        ai_stage = AIParseStage(
+            lambda job: self.request_ai_parse(job["prompt"]),
+            concurrency=self.ai_concurrency,
+            tokens_per_minute=self.ai_tokens_per_minute,
+            on_result=self._record_ai_result,
+            shared_slots=self.ai_shared_slots
+        )
+        major_slots = []
+        crawl_futures = []
+        with ai_stage, ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # Fetch every college page concurrently; HostPoliteness keeps this gentle on the server
+            college_pages = list(pool.map(lambda college: self.get_page_content(college['url']), college_links))
+
+            # Queue every major as soon as its college page is parsed
+            for college, college_content in zip(college_links, college_pages):
+                print(f"\nProcessing college: {college['name']}")
+                college_data = {
+                    "name": college['name'],
+                    "majors": []
+                }
+                school_data["colleges"].append(college_data)
+
+                if college_content:
+                    # Get all major links for this college
+                    major_links = self.extract_major_links(college_content, college['url'], college['name'])
+                    for major in major_links:
+                        slot = {
+                            "college_data": college_data,
+                            "college_name": college['name'],
+                            "major_name": major['name'],
+                            "position": len(major_slots),
+                            "fetched": False
+                        }
+                        major_slots.append(slot)
+                        crawl_futures.append(pool.submit(self.crawl_major, college['name'], major, ai_stage, slot))
+
+        # Surface any crawl worker errors
+        for future in crawl_futures:
+            future.result()
+
+        # Collect results in page order so the output matches a serial crawl
+        for slot in major_slots:
+            if not slot["fetched"]:
+                continue
+            if slot.get("status") == "parsed":
+                if "result" in slot:
+                    slot["college_data"]["majors"].append(slot.pop("result"))
+                school_data["processing_stats"]["total_pages_processed"] += 1
+            else:
+                school_data["processing_stats"]["failed_pages"] += 1
+        school_data["processing_stats"]["ai_rate_limited"] = ai_stage.stats["rate_limited"]
+        school_data["processing_stats"].update(self.crawl_stats)
+
         # Update final statistics
         school_data["processing_stats"].update({
             "skipped_duplicates": len(self.processed_urls) - school_data["processing_stats"]["total_pages_processed"],
             "skipped_circular_refs": len([url for url in self.processed_urls if self.is_circular_reference(url)])
         })
-        
-        return school_data
+        if self.output_writer:
+            self.output_writer.write({"type": "stats", "processing_stats": school_data["processing_stats"]})
 
     def save_json(self, data, school_name):
         """Save the parsed data to a JSON file"""
-        filename = f"{school_name.lower().replace(' ', '_')}.json"
+        filename = f"{school_slug(school_name)}.json"
         try:
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
             print(f"\nSuccessfully saved data to {filename}")
-            print("\nProcessing Statistics:")
-            print(f"Total Pages Processed: {data['processing_stats']['total_pages_processed']}")
-            print(f"Skipped Duplicates: {data['processing_stats']['skipped_duplicates']}")
-            print(f"Skipped Circular References: {data['processing_stats']['skipped_circular_refs']}")
-            print(f"Failed Pages: {data['processing_stats']['failed_pages']}")
+            print_stats(data['processing_stats'])
         except Exception as e:
             print(f"Error saving JSON file: {str(e)}")
+def print_stats(stats):
+    """Print a crawl's processing statistics"""
+    print("\nProcessing Statistics:")
+    print(f"Total Pages Processed: {stats['total_pages_processed']}")
+    print(f"Skipped Duplicates: {stats['skipped_duplicates']}")
+    print(f"Skipped Circular References: {stats['skipped_circular_refs']}")
+    print(f"Failed Pages: {stats['failed_pages']}")
+
 def main():
+    arg_parser = argparse.ArgumentParser(description="Crawl a school's academic catalog into curriculum JSON")
+    arg_parser.add_argument('--school', help="School name (prompted for if omitted)")
+    arg_parser.add_argument('--url', help="Main academic catalog URL (prompted for if omitted)")
+    arg_parser.add_argument('--resume', action='store_true',
+                            help="Continue an interrupted crawl, skipping majors already in its .ndjson file")
+    args = arg_parser.parse_args()
+
     # Get user input
-    school_name = input("Enter the school name: ")
-    base_url = input("Enter the main academic catalog URL: ")
+    school_name = args.school or input("Enter the school name: ")
+    base_url = args.url or input("Enter the main academic catalog URL: ")
+    slug = school_slug(school_name)
 
-    # Initialize parser
-    parser = CurriculumParser()
+    # Initialize parser; the crawl cache makes re-runs conditional and skips unchanged LLM parses
+    parser = CurriculumParser(cache_path=f"{slug}_crawl_cache.sqlite3")
     
-    # Process the entire school
+    # Process the entire school, streaming each major to NDJSON as soon as it is parsed
     print("\nStarting curriculum data collection...")
-    school_data = parser.process_school(base_url)
+    records_file = f"{slug}.ndjson"
+    school_data = parser.process_school(base_url, output_path=records_file, resume=args.resume,
+                                        school_name=school_name)
     
     if school_data:
-        print("\nSaving results...")
-        parser.save_json(school_data, school_name)
+        print(f"\nSaved parsed majors to {records_file}")
+        print_stats(school_data["processing_stats"])
+        transformed_file = f"{slug}_transformed.json"
+        process_file(records_file, transformed_file)
+        print(f"Wrote transformed catalog to {transformed_file}")
         print("Process completed successfully!")
     else:
         print("Error: Failed to process school data")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,109 @@
+import lxml.html
+from lxml import etree
+
+# Boilerplate subtrees whose text is dropped (links inside them are still collected)
+SKIP_TAGS = {'nav', 'header', 'footer', 'script', 'style'}
+LIST_TAGS = {'ul', 'ol'}
+COURSE_LIST_INDICATORS = ('credit', 'course', 'semester')
+SECTION_CLASS_TERMS = ('course', 'curriculum', 'semester', 'year')
+# Never treat the whole document as a "course section" because of a class on <html>/<body>
+CONTAINER_TAGS = {'html', 'body'}
+
+_parser = lxml.html.HTMLParser(encoding='utf-8')
+
+
+def _block_kind(element):
+    """Return 'table', 'list' or 'section' if element starts a course-content block"""
+    tag = element.tag
+    if tag == 'table':
+        return 'table'
+    if tag in LIST_TAGS:
+        return 'list'
+    if tag not in CONTAINER_TAGS:
+        css_class = (element.get('class') or '').lower()
+        if css_class and any(term in css_class for term in SECTION_CLASS_TERMS):
+            return 'section'
+    return None
+
+
+def extract_page(html_content):
+    """
+    Walk an HTML document once and collect everything the crawler needs from it.
+
+    Returns a dict with:
+      links      - [(link_text, href)] for every <a href>, boilerplate included
+      blocks     - de-duplicated text of course tables, course lists and elements whose
+                   class mentions course/curriculum/semester/year, one line per block
+      lines      - visible text in document order, one stripped line per text node, with
+                   boilerplate removed and each block collapsed onto a single line
+    """
+    result = {'links': [], 'blocks': [], 'lines': []}
+    if not html_content or not html_content.strip():
+        return result
+    try:
+        root = lxml.html.document_fromstring(html_content.encode('utf-8'), parser=_parser)
+    except (etree.ParserError, ValueError):
+        return result
+
+    blocks = result['blocks']
+    seen_blocks = set()
+    lines = result['lines']
+    skip_depth = 0
+    # Open block: [element, kind, text pieces]; blocks do not nest, inner text joins the outer one
+    open_block = None
+    # Open links: [element, href, text pieces]
+    open_links = []
+
+    def add_text(text):
+        if not text:
+            return
+        for link in open_links:
+            link[2].append(text)
+        if skip_depth:
+            return
+        if open_block is not None:
+            open_block[2].append(text)
+        else:
+            lines.extend(line.strip() for line in text.split('\n') if line.strip())
+
+    for event, element in etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+        if event in ('comment', 'pi'):
+            add_text(element.tail)
+            continue
+
+        if event == 'start':
+            tag = element.tag
+            if tag == 'a' and element.get('href') is not None:
+                open_links.append([element, element.get('href'), []])
+            if tag in SKIP_TAGS:
+                skip_depth += 1
+            elif not skip_depth and open_block is None:
+                kind = _block_kind(element)
+                if kind:
+                    open_block = [element, kind, []]
+            add_text(element.text)
+            continue
+
+        # end event
+        if element.tag in SKIP_TAGS:
+            skip_depth -= 1
+        if open_links and open_links[-1][0] is element:
+            _, href, pieces = open_links.pop()
+            result['links'].append((''.join(pieces).strip(), href))
+        if open_block is not None and open_block[0] is element:
+            _, kind, pieces = open_block
+            open_block = None
+            block_text = ' '.join(piece.strip() for piece in pieces if piece.strip())
+            keep = kind != 'list' or any(indicator in block_text.lower() for indicator in COURSE_LIST_INDICATORS)
+            if keep:
+                if block_text and block_text not in seen_blocks:
+                    seen_blocks.add(block_text)
+                    blocks.append(block_text)
+                    add_text(block_text)
+            else:
+                # Not a course list after all: its text belongs to the page body
+                for piece in pieces:
+                    add_text(piece)
+        add_text(element.tail)
+
+    return result
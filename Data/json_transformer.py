@@ -1,83 +1,176 @@
+import heapq
 import json
+import sys
+import tempfile
+import textwrap
 
-def transform_curriculum_data(input_data):
+from compact_catalog import CompactCatalogBuilder, compact_path_for
+from course_index import CourseIndexBuilder, course_index_path_for, write_index
+from ndjson_records import read_records, records_from_school
+
+# Classifications we want to preserve
+CLASSIFICATIONS = ["freshman", "sophomore", "junior", "senior"]
+# Transformed majors held in memory before a sorted run is spilled to a temp file
+RUN_SIZE = 256
+
+
+def transform_major(major):
     """
-    Transform curriculum JSON data into a simplified format with classifications.
+    Transform one parsed major into the simplified format, or return None if it has no courses.
     """
-    output = {
-        "school_name": input_data["school_name"],
-        "majors": []
+    curriculum = major.get("curriculum", {})
+
+    # Skip if curriculum is empty
+    if not curriculum:
+        return None
+
+    # Check if any semester has courses
+    has_courses = False
+    for year in curriculum.values():
+        for semester in year.values():
+            if semester:
+                has_courses = True
+                break
+        if has_courses:
+            break
+
+    if not has_courses:
+        return None
+
+    # Initialize the transformed major
+    transformed_major = {
+        "name": major["major_name"],
+        "curriculum": {}
     }
-    
-    # Classifications we want to preserve
-    classifications = ["freshman", "sophomore", "junior", "senior"]
-    
-    # Process each college
-    for college in input_data["colleges"]:
-        # Process each major in the college
-        for major in college.get("majors", []):
-            curriculum = major.get("curriculum", {})
-            
-            # Skip if curriculum is empty
-            if not curriculum:
-                continue
-            
-            # Check if any semester has courses
-            has_courses = False
-            for year in curriculum.values():
-                for semester in year.values():
-                    if semester:
-                        has_courses = True
-                        break
-                if has_courses:
-                    break
-            
-            if not has_courses:
+
+    # Process each classification
+    for classification in CLASSIFICATIONS:
+        if classification in curriculum:
+            year_data = curriculum[classification]
+
+            # Only add classification if it has courses
+            if year_data["fall"] or year_data["spring"]:
+                transformed_major["curriculum"][classification] = {
+                    "fall": [f"{course['code']} {course['name']}"
+                           for course in year_data.get("fall", [])],
+                    "spring": [f"{course['code']} {course['name']}"
+                             for course in year_data.get("spring", [])]
+                }
+
+    # Only keep major if it has any courses
+    if not transformed_major["curriculum"]:
+        return None
+    return transformed_major
+
+
+def _order_key(entry):
+    return entry[0], entry[1]
+
+
+def _spill(run):
+    """Write a run of (position, arrival, major) entries, sorted, to a temp file"""
+    run.sort(key=_order_key)
+    run_file = tempfile.TemporaryFile('w+', encoding='utf-8')
+    for entry in run:
+        run_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    run_file.seek(0)
+    return run_file
+
+
+def _read_run(run_file):
+    for line in run_file:
+        yield tuple(json.loads(line))
+
+
+def transform_curriculum_data(records):
+    """
+    Transform a stream of crawl records into simplified majors with classifications.
+
+    Generator over the transformed majors in catalog page order. A crawl journals majors as
+    the LLM finishes them, so records are put back in "position" order with an external
+    merge sort: at most RUN_SIZE transformed majors are held in memory at once, the rest
+    wait in sorted temp-file runs. Accepts records from read_records() / records_from_school().
+    """
+    run = []
+    run_files = []
+    try:
+        for arrival, record in enumerate(records):
+            if record.get("type") != "major":
                 continue
-            
-            # Initialize the transformed major
-            transformed_major = {
-                "name": major["major_name"],
-                "curriculum": {}
-            }
-            
-            # Process each classification
-            for classification in classifications:
-                if classification in curriculum:
-                    year_data = curriculum[classification]
-                    
-                    # Only add classification if it has courses
-                    if year_data["fall"] or year_data["spring"]:
-                        transformed_major["curriculum"][classification] = {
-                            "fall": [f"{course['code']} {course['name']}" 
-                                   for course in year_data.get("fall", [])],
-                            "spring": [f"{course['code']} {course['name']}" 
-                                     for course in year_data.get("spring", [])]
-                        }
-            
-            # Only add major if it has any courses
-            if transformed_major["curriculum"]:
-                output["majors"].append(transformed_major)
-    
-    return output
-
-def process_file(input_file_path, output_file_path):
+            transformed_major = transform_major(record["major"])
+            if transformed_major:
+                run.append((record.get("position", arrival), arrival, transformed_major))
+                if len(run) >= RUN_SIZE:
+                    run_files.append(_spill(run))
+                    run = []
+        run.sort(key=_order_key)
+        runs = [_read_run(run_file) for run_file in run_files] + [iter(run)]
+        for _, _, transformed_major in heapq.merge(*runs, key=_order_key):
+            yield transformed_major
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+def write_transformed(school_name, majors, output_file):
     """
-    Process the input JSON file and write the transformed data to the output file.
+    Stream {"school_name": ..., "majors": [...]} to an open file, one major at a time.
+    Produces the same layout as json.dump(..., indent=2).
     """
-    # Read input JSON
-    with open(input_file_path, 'r') as file:
-        input_data = json.load(file)
-    
-    # Transform the data
-    transformed_data = transform_curriculum_data(input_data)
-    
-    # Write output JSON
+    output_file.write('{\n')
+    output_file.write(f'  "school_name": {json.dumps(school_name)},\n')
+    output_file.write('  "majors": [')
+    first = True
+    for major in majors:
+        output_file.write('\n' if first else ',\n')
+        output_file.write(textwrap.indent(json.dumps(major, indent=2), '    '))
+        first = False
+    output_file.write(']\n}' if first else '\n  ]\n}')
+
+
+def read_input_records(input_file_path):
+    """Yield crawl records from either a streamed .ndjson file or a legacy raw .json file"""
+    if input_file_path.endswith('.ndjson'):
+        yield from read_records(input_file_path)
+    else:
+        with open(input_file_path, 'r') as file:
+            yield from records_from_school(json.load(file))
+
+
+def process_file(input_file_path, output_file_path, compact=True, course_index=True):
+    """
+    Process the input file and write the transformed data to the output file.
+    NDJSON input is streamed record by record and put back in page order with bounded
+    memory (see transform_curriculum_data).
+    With compact, the same majors are also written as a compact .ccat catalog next to it,
+    and with course_index, a .cidx inverted index from course code to the majors requiring it.
+    Both builders keep their whole index in memory until it is written (interned strings
+    and course ids, not the majors themselves), so that part still grows with the catalog.
+    """
+    records = read_input_records(input_file_path)
+    header = next(records)
+    if header.get("type") != "school":
+        raise ValueError(f"{input_file_path} does not start with a school record")
+
+    # Transform and write the data one major at a time
+    majors = transform_curriculum_data(records)
+    builder = None
+    if compact:
+        builder = CompactCatalogBuilder(header["school_name"])
+        majors = builder.track(majors)
+    indexer = None
+    if course_index:
+        indexer = CourseIndexBuilder(header["school_name"])
+        majors = indexer.track(majors)
     with open(output_file_path, 'w') as file:
-        json.dump(transformed_data, file, indent=2)
+        write_transformed(header["school_name"], majors, file)
+    if builder:
+        builder.write(compact_path_for(output_file_path), output_file_path)
+    if indexer:
+        write_index(indexer, course_index_path_for(output_file_path), output_file_path)
 
 # Example usage
 if __name__ == "__main__":
-    input_file = "bethune-cookman_university.json"
-    output_file = "bethune-cookman_university_transformed.json"
-    process_file(input_file, output_file)
\ No newline at end of file
+    input_file = sys.argv[1] if len(sys.argv) > 1 else "bethune-cookman_university.json"
+    output_file = sys.argv[2] if len(sys.argv) > 2 else "bethune-cookman_university_transformed.json"
+    process_file(input_file, output_file)
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+
+# Record types, one JSON object per line:
+#   {"type": "school", "school_name": ...}                          first line
+#   {"type": "major", "college_name": ..., "url": ..., "position": n, "major": {...}}
+#   {"type": "stats", "processing_stats": {...}}                    last line of a finished crawl
+
+
+class NDJSONWriter:
+    """
+    Thread-safe append-only NDJSON writer.
+
+    Every record is flushed (and fsynced) as soon as it is written, so a crash mid-crawl
+    leaves every completed major on disk; the file doubles as the crawl's checkpoint
+    journal (see prepare_resume).
+    """
+
+    def __init__(self, path, mode='w', fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._file = open(path, mode, encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_records(path):
+    """Yield records from an NDJSON file, skipping a truncated final line left by a crash"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith('\n'):
+                    raise
+                print(f"Ignoring truncated last record in {path}")
+
+
+def records_from_school(school_data):
+    """Yield NDJSON-style records from an in-memory school dict (raw crawl JSON format)"""
+    yield {"type": "school", "school_name": school_data["school_name"]}
+    position = 0
+    for college in school_data.get("colleges", []):
+        for major in college.get("majors", []):
+            yield {"type": "major", "college_name": college.get("name"), "position": position, "major": major}
+            position += 1
+    if "processing_stats" in school_data:
+        yield {"type": "stats", "processing_stats": school_data["processing_stats"]}
+
+
+def prepare_resume(path):
+    """
+    Get an interrupted crawl's NDJSON file ready to be appended to.
+
+    Keeps the school record and every complete major record, drops a truncated last
+    line and any stats record, and returns the set of major page URLs already parsed.
+    Returns None if there is nothing to resume from.
+    """
+    if not os.path.exists(path):
+        return None
+    records = read_records(path)
+    header = next(records, None)
+    if not header or header.get("type") != "school":
+        return None
+
+    # Rewrite through a temp file, one record at a time
+    completed_urls = set()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        for record in records:
+            if record.get("type") == "stats":
+                continue
+            if record.get("type") == "major" and record.get("url"):
+                if record["url"] in completed_urls:
+                    continue
+                completed_urls.add(record["url"])
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return completed_urls
@@ -0,0 +1,93 @@
+import re
+
+from ai_pipeline import estimate_tokens
+
+# tiktoken is optional; without it token counts are estimated from text length
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('o200k_base')
+except Exception:
+    _encoding = None
+
+# Course codes like "MAT 231", "EN 131", "ML_ 131" or "BIO 201L"
+COURSE_CODE_PATTERN = re.compile(r'\b[A-Z]{2,4}_?\s?\d{3}[A-Z]?\b')
+CREDIT_PATTERN = re.compile(r'\b(credits?|credit hours?|hours?|hrs?\.?|sch)\b', re.IGNORECASE)
+HEADING_PATTERN = re.compile(
+    r'\b(fall|spring|summer|freshman|sophomore|junior|senior|first|second|third|fourth)\b.*\b(year|semester|term)\b'
+    r'|\b(year|semester|term)\s+(one|two|three|four|[1-8])\b'
+    r'|\b(fall|spring|summer)\s+(semester|term)\b'
+    r'|\btotal\b.*\b(credits?|hours?)\b',
+    re.IGNORECASE
+)
+
+
+def count_tokens(text):
+    """Token count with tiktoken when available, otherwise a length-based estimate"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def _line_priority(line):
+    """2 for course lines, 1 for credit/semester lines, 0 for everything else"""
+    if COURSE_CODE_PATTERN.search(line):
+        return 2
+    if HEADING_PATTERN.search(line) or CREDIT_PATTERN.search(line):
+        return 1
+    return 0
+
+
+def compact_curriculum_text(text, token_budget, context_lines=1):
+    """
+    Keep only the lines of a cleaned catalog page that look like curriculum content.
+
+    Lines with course codes, credit hours or semester headings are kept along with
+    `context_lines` neighbours on each side, in their original order. If that still
+    exceeds token_budget, context lines are dropped first, then semester/credit lines,
+    and finally the tail is cut. Pages with no matching lines are truncated as-is.
+    Returns (compacted_text, tokens_before, tokens_after).
+    """
+    tokens_before = count_tokens(text)
+    lines = text.split('\n')
+    priorities = [_line_priority(line) for line in lines]
+
+    if not any(priorities):
+        kept = lines
+        levels = [0] * len(lines)
+    else:
+        # Level 3 = course line, 2 = semester/credit line, 0 = context neighbour
+        keep_level = {}
+        for i, priority in enumerate(priorities):
+            if not priority:
+                continue
+            keep_level[i] = max(keep_level.get(i, 0), priority + 1)
+            for j in range(max(0, i - context_lines), min(len(lines), i + context_lines + 1)):
+                keep_level.setdefault(j, 0)
+        indices = sorted(keep_level)
+        kept = [lines[i] for i in indices]
+        levels = [keep_level[i] for i in indices]
+
+    line_tokens = [count_tokens(line) + 1 for line in kept]
+    total = sum(line_tokens)
+    # Drop the least useful lines until the budget fits
+    for level in (0, 2):
+        if total <= token_budget:
+            break
+        selected = [(line, tokens, lvl) for line, tokens, lvl in zip(kept, line_tokens, levels) if lvl > level]
+        if not selected:
+            break
+        kept, line_tokens, levels = (list(column) for column in zip(*selected))
+        total = sum(line_tokens)
+
+    if total > token_budget:
+        budgeted = []
+        used = 0
+        for line, tokens in zip(kept, line_tokens):
+            if used + tokens > token_budget:
+                break
+            budgeted.append(line)
+            used += tokens
+        kept = budgeted
+
+    compacted = '\n'.join(kept)
+    return compacted, tokens_before, count_tokens(compacted)